@@ -1,28 +1,8 @@
-<<<<<<< HEAD
 # CHANGE THIS VALUE TO INCREASE OR DECREASE THE SCRIPT'S
 # ALLOWABLE PASSWORD LENGTH FOR BRUTE FORCING
-=======
-# # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # #
-#                                                                             #
-#   Et Tu, Brute ?                                                            #
-#   by Toby Sheets                                                            #
-#   CU Boulder                                                                #
-#   TCP - Digital Forensics                                                   #
-#                                                                             #
-# Takes an MD% hashed password of up to maxPassLength characters and          #
-# brute forces the value from a string library of ascii characters.           #
-#                                                                             #
-# # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # #
-
-
-# CHANGE THIS VALUE TO INCREASE 
-# OR DECREASE THE SCRIPT'S 
-# ALLOWABLE PASSWORD LENGTH
->>>>>>> 8573649931b72d2493a8590358ab30f36f2a5c35
 # ⬇ ⬇ ⬇ ⬇ ⬇ ⬇ ⬇ ⬇
 maxPassLength = 6   # Set to 6 for this project but could be much larger in real-world usage
 
-<<<<<<< HEAD
 # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # #
 #                                                                                           #
 #   Et Tu, Brute ?                                                                          #
@@ -30,20 +10,67 @@ maxPassLength = 6   # Set to 6 for this project but could be much larger in real
 #   CU Boulder                                                                              #
 #   TCP - Digital Forensics                                                                 #
 #                                                                                           #
-# Crack an MD5-hashed password. Defaults to a brute force method unless you supply a        #
-# wordlist, then it will default to a dictionary attack. There are a few mangler rules set  #
-# up by adding the -m='' flag. Ex.: -m='c' iterates through the dictionary and capitalizes  #
-# the first letter.                                                                         #
+# Crack an MD5-hashed password (or SHA-1, SHA-256 and NTLM with -t). Defaults to a brute    #
+# force method unless you supply a wordlist, then it will default to a dictionary attack.   #
+# There are a few mangler rules set up by adding the -m='' flag. Ex.: -m='c' iterates       #
+# through the dictionary and capitalizes the first letter.                                  #
 #                                                                                           #
-#   usage: ettubrute [-h] [-d D] [-m M] pw                                                  #
+#   usage: ettubrute [-h] [-t TYPE] [-d D] [-m M] [-r R] [--mask MASK] [-1 CS] [-2 CS]      #
+#                    [-3 CS] [-4 CS] [--min-length N] [--max-length N]                      #
+#                    [--append-mask MASK] [--prepend-mask MASK] [--markov FILE] [-w N]      #
+#                    [--mangled-only] [--dedup-mb MB] [--checkpoint FILE]                   #
+#                    [--checkpoint-interval SECS] [--resume] [--pot FILE] [--no-pot]        #
+#                    [--build-index FILE] [--index FILE] [--benchmark FILE]                 #
+#                    [--compile-wordlist FILE] [--word-length MIN-MAX] [--shard I/N]        #
+#                    [--coordinator HOST:PORT] [--worker HOST:PORT] [--daemon [SOCKET]]     #
+#                    [--progress {bar,json,silent}] [--progress-interval SECS]              #
+#                    [--plan [FILE]] [--stage-seconds SECS] [--stage-candidates N] [pw]     #
 #                                                                                           #
 #   positional arguments:                                                                   #
-#   pw                   md5 hash string -OR- /path/to/md5hash_file                         #
+#   pw                   hash string -OR- /path/to/hash_file (one hash per line)            #
 #                                                                                           #
 #   optional arguments:                                                                     #
 #       -h, --help           show this help message and exit                                #
+#       -t TYPE, --hash-type TYPE  [Optional] md5 (default), sha1, sha256 or ntlm           #
+#                            md5-numpy hashes big batches with NumPy, if it's installed     #
+#                            md5-salt-pass, md5-pass-salt (and sha1-/sha256-) crack salted  #
+#                            hashes given as hash:salt, one hash per candidate per salt     #
 #       -d D, -dictionary D  [Optional] /path/to/wordlist_file for dictionary-based crack   #
 #       -m M, -mangler M     [Optional] enables wordlist mangling rules.                    #
+#       -r R, --rules R      [Optional] /path/to/rules_file of hashcat-style rules          #
+#       --mangled-only       [Optional] skip the wordlist entries themselves, only test     #
+#                            what -m, -r and hybrid masks make of them                      #
+#       --dedup-mb MB        [Optional] skip candidates an earlier word already made,       #
+#                            remembered in a Bloom filter of MB megabytes                   #
+#       --mask MASK          [Optional] mask attack with a charset per position, see below  #
+#       -1 CS ... -4 CS      [Optional] custom charsets for ?1 - ?4 in a mask, e.g. -1 ?l?d #
+#       --min-length N       [Optional] shortest length to try with a mask or brute force   #
+#       --max-length N       [Optional] longest length to try with a mask or brute force    #
+#       --append-mask MASK   [Optional] hybrid: wordlist entry + every candidate of a mask  #
+#       --prepend-mask MASK  [Optional] hybrid: every candidate of a mask + wordlist entry  #
+#       --markov FILE        [Optional] wordlist to learn brute force character order from  #
+#                            (the pot file is always used too, unless --no-pot)             #
+#       -w N, --workers N    [Optional] crack with N processes (0 = one per CPU core)       #
+#       --checkpoint FILE    [Optional] where to save progress (ettubrute.checkpoint)       #
+#       --checkpoint-interval SECS  [Optional] seconds between checkpoints (default 60)     #
+#       --resume             [Optional] continue the run saved in the checkpoint file       #
+#       --pot FILE           [Optional] file of every hash ever cracked (ettubrute.pot)     #
+#       --no-pot             [Optional] don't read or write the pot file                    #
+#       --build-index FILE   [Optional] hash every -d/-m/-r candidate once into an index    #
+#       --index FILE         [Optional] look the hashes up in an index instead of cracking  #
+#       --compile-wordlist FILE  [Optional] dedupe -d into a binary wordlist for fast -d    #
+#       --word-length MIN-MAX  [Optional] only use wordlist entries of these lengths        #
+#       --shard I/N          [Optional] only use the I-th of N slices of a compiled -d      #
+#       --coordinator HOST:PORT  [Optional] hand the crack out to workers in leases         #
+#       --worker HOST:PORT   [Optional] crack leases for the coordinator at HOST:PORT       #
+#       --daemon [SOCKET]    [Optional] crack JSON-line jobs from stdin or a Unix socket    #
+#       --benchmark FILE     [Optional] time every attack path and save the results as JSON #
+#       --progress MODE      [Optional] bar (default), json lines or silent                 #
+#       --progress-interval SECS  [Optional] seconds between progress updates (default 1)   #
+#       --plan [FILE]        [Optional] pot, -d as is, cheap then expensive manglers, -r,   #
+#                            common masks, then brute force by length (or a JSON plan)      #
+#       --stage-seconds SECS [Optional] time budget of each plan stage (default 300)        #
+#       --stage-candidates N [Optional] candidate budget of each plan stage (0 = none)      #
 #                                                                                           #
 #      Available mangling flags:                                                            #
 #      Examples using 'password' from the wordlist:                                         #
@@ -62,6 +89,27 @@ maxPassLength = 6   # Set to 6 for this project but could be much larger in real
 #       T - capitalize, truncate and prepend/append 4 nums and '!': Pass1454!               #
 #       y - Prepend/append 2- and 4-digit years from 1970-2010: 70password, password2019    #
 #                                                                                           #
+#      Rules files (-r) hold one rule per line, each a stack of hashcat-style functions     #
+#      applied left to right. Lines starting with # are comments. N is a position 0-9 or    #
+#      A-Z (10-35), X and Y are single characters:                                          #
+#                                                                                           #
+#       :  do nothing            l  lowercase             u  uppercase                      #
+#       c  capitalize            C  invert capitalize     t  toggle case                    #
+#       TN toggle case at N      r  reverse               d  duplicate                      #
+#       pN duplicate N times     f  reflect               {  rotate left                    #
+#       }  rotate right          $X append X              ^X prepend X                      #
+#       [  delete first          ]  delete last           DN delete at N                    #
+#       xNM extract M from N     ONM omit M from N        iNX insert X at N                 #
+#       oNX overwrite at N       'N truncate at N         sXY replace X with Y              #
+#       @X purge X               zN dupe first N times    ZN dupe last N times              #
+#       q  dupe every char       k  swap first two        K  swap last two                  #
+#       *NM swap N and M         E  title case                                              #
+#                                                                                           #
+#      Masks (--mask) give the characters allowed in each position of the password:         #
+#       ?l a-z    ?u A-Z    ?d 0-9    ?s space + punctuation    ?a all of those             #
+#       ?h 0-9a-f    ?H 0-9A-F    ?b any byte    ?1 - ?4 custom    ?? a literal ?           #
+#       Anything else is a literal character. ?u?l?l?l?l?d?d matches Passw12.               #
+#                                                                                           #
 # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # #
 
 # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # #
@@ -83,25 +131,87 @@ maxPassLength = 6   # Set to 6 for this project but could be much larger in real
 #        reversing the dictionary word)                                                  #
 #        ettubrute 'my_hash_file.txt' -d 'dictionary.txt' -m='Cr'                           #
 #                                                                                           #
+#   6 - Mask attack: a capital, 4 lowercase letters and two digits or symbols               #
+#        ettubrute 'my_hash_file.txt' --mask '?u?l?l?l?l?1?1' -1 '?d?s'                     #
+#                                                                                           #
+#   7 - Hybrid attack: each dictionary word followed by 1 to 4 digits                       #
+#        ettubrute 'my_hash_file.txt' -d 'dictionary.txt' --append-mask '?d?d?d?d'          #
+#        --min-length 1                                                                     #
+#                                                                                           #
+#   8 - Precompute a wordlist + mangler run once, then look new hashes up in milliseconds   #
+#        ettubrute -d 'dictionary.txt' -m 'cny' --build-index 'dictionary.idx'              #
+#        ettubrute 'my_hash_file.txt' --index 'dictionary.idx'                              #
+#                                                                                           #
+#   9 - Cheapest attacks first, giving every stage of the plan at most 2 minutes            #
+#        ettubrute 'my_hash_file.txt' -d 'dictionary.txt' --plan --stage-seconds 120        #
+#                                                                                           #
 # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # # #
 
 from math import floor          # For calculating program execution time
+from os   import fsync          # For making sure checkpoints actually hit the disk
 from os   import name           # For determing OS name to play beep notification
 from os   import path           # For accessing user files
+from os   import remove         # For cleaning up checkpoints after a finished run
+from os   import replace        # For swapping in a new checkpoint file in one step
 from os   import system         # For determing OS to play beep notification
 import argparse                 # For taking command line args[]
+import collections              # For counting characters when training the Markov model
+import contextlib               # For keeping crack() jobs from printing to the daemon's stdout
+import io                       # For collecting what a crack() job printed
 import hashlib                  # For calculating md5 hashes of passwords
 import itertools                # For looping through password values
+import math                     # For the MD5 round constants
+import heapq                    # For merging sorted runs of digests into one index file
+import json                     # For reading and writing checkpoint files
+import mmap                     # For binary searching an index file without reading it all
+import shutil                   # For copying plaintexts into the finished index file
+import signal                   # For leaving Ctrl+C handling to the main process
+import socket                   # For talking to the coordinator of a distributed crack
+import socketserver             # For serving keyspace leases to distributed workers
 import string                   # For accessing string ascii values, digits and punctuation
+import struct                   # For the fixed-width records in index files
 import sys                      # For exiting the app on completion.
+import tempfile                 # For spilling sorted runs of digests while building an index
+import threading                # For drawing progress without slowing down the cracking loops
 import time                     # For calculating program execution time
+import os                       # For appending to the pot file with a single write
 import random                   # For randomizing our test library
-import winsound                 # For notifing user when pass has been cracked
+import queue                    # For the Full/Empty exceptions of the dictionary pipeline queues
+import multiprocessing          # For spreading brute force work across CPU cores
+try:
+    import winsound             # For notifing user when pass has been cracked
+except ImportError:
+    winsound = None             # Not on Windows, so I'll fall back to the terminal bell
+try:
+    import fcntl                # For locking the pot file when several runs share it
+except ImportError:
+    fcntl = None                # Windows, so I'll rely on appends being a single write
+try:
+    import numpy as np          # For hashing big batches of MD5 candidates all at once
+except ImportError:
+    np = None                   # Not installed, so -t md5-numpy falls back to hashlib
 
 testPW              = ''
 startTime           = 0
 endTime             = 0
 testedCombinations  = 0
+targets             = set()     # Raw 16-byte digests I'm still trying to crack
+targetCount         = 0         # How many hashes the user gave me in total
+crackedHashes       = {}        # Raw digest -> cracked plaintext (bytes), in the order I found them
+resumeState         = None      # Contents of the checkpoint file when resuming a run
+markovOrder         = None      # Ranked characters per position and previous character, see trainMarkovModel()
+potFile             = None      # Where cracked hashes get saved for future runs (None = don't)
+hashBackend         = None      # HashBackend for the --hash-type being cracked, set in main()
+progressReporter    = None      # The ProgressReporter drawing the status line right now, if any
+coordinatorLink     = None      # CoordinatorLink to the coordinator when running as a --worker
+warmCache           = None      # Wordlists, rule files and pot files kept in memory between crack() jobs, see warmLoad()
+interactive         = True      # False while a crack() job or attack plan runs, so nothing clears the terminal
+attackPlan          = None      # The --plan being run: its stages, where it's at and what each stage did
+stageBudget         = None      # StageBudget of the attack plan stage running right now, if any
+WORDLIST_CHUNK_SIZE = 1 << 20   # Bytes of wordlist read from disk at a time
+WORDLIST_BATCH_SIZE = 4096      # Wordlist entries handed to the hasher at a time
+CANDIDATE_BATCH_SIZE = 1 << 14  # Mangled candidates collected before they're hashed
+CHECKPOINT_VERSION  = 1
 manglerRules        = {
     'cap_ends'  : False,
     'capall'    : False,
@@ -117,20 +227,9 @@ manglerRules        = {
     'trunc_app' : False,
     'years'     : False
     }
-mangledPWs          = set()
-testedPWSet         = set()
-=======
-import hashlib                      # For calculating md5 hashes of passwords
-import itertools                    # For looping through password values
-import random                       # For randomizing our test library
-import string                       # For accessing string ascii values, digits and punctuation
-import sys                          # For exiting the app on completion.
-import time                         # For calculating program execution time
-from   math import floor            # "     "           "       "       "
-from   os   import system, name     # For determing which OS user is using to execute certain commands
-import winsound                     # For notifing user when pass has been cracked
-
->>>>>>> 8573649931b72d2493a8590358ab30f36f2a5c35
+manglerPipeline     = []        # Rule generators for the enabled mangler rules, see compileManglerRules()
+candidateFilter     = None      # CandidateFilter skipping repeat mangled candidates (--dedup-mb), if any
+mangledOnly         = False     # Only test what the manglers make of each word, not the word itself (--mangled-only)
 
 
 class bcolors:
@@ -145,81 +244,165 @@ class bcolors:
 
 def main(crackParams):
     # Extract user input from command line args
-    global startTime, endTime, testedCombinations, testPW
-    if crackParams.d == None:
-        # This is a brute force crack.
+    global startTime, endTime, testedCombinations, testPW, targets, targetCount, potFile, hashBackend
+    hashBackend = HASH_BACKENDS[crackParams.hash_type]
+    if isinstance(hashBackend, NumpyMD5Backend) and np == None:
+        print(f"{bcolors.YELLOW}NumPy isn't installed, so {crackParams.hash_type} will use plain hashlib.{bcolors.NORMAL}")
+    if hashBackend.salted and (crackParams.index != None or crackParams.build_index != None):
+        # An index maps unsalted digests back to words, so it's no help with salted ones
+        print(f"{crackParams.hash_type} hashes are salted, so they can't be looked up in or written to an index.")
+        sys.exit()
+    if crackParams.compile_wordlist != None:
+        # Not cracking anything, just turning a text wordlist into the compiled format
+        compileWordlist(crackParams)
+        return
+    if crackParams.build_index != None:
+        # Not cracking anything, just hashing a wordlist + mangler run once into an index file
         startTime   = int(time.time())
-        crackedPass = crack_BruteForce(crackParams)
+        buildDigestIndex(crackParams)
         endTime     = int(time.time())
+        calculateExecutionTime(startTime, endTime, testedCombinations)
+        return
+    if crackParams.benchmark != None:
+        # Not cracking anything, just timing how fast each attack path runs on this machine
+        runBenchmarks(crackParams)
+        return
+    if crackParams.worker != None:
+        # The hashes, mode and everything else come from the coordinator
+        runDistributedWorker(crackParams)
+        return
+    if crackParams.daemon != None:
+        # The hashes come in as jobs, with my own options as the defaults for every job
+        runDaemon(crackParams)
+        return
+    if crackParams.resume:
+        # Everything about the run (hashes, mode, wordlist, charset order, etc.) comes
+        # from the checkpoint so it continues exactly where it stopped.
+        loadCheckpoint(crackParams)
     else:
-        # User supplied a dictionary, so this is a dictionary crack.
+        targets     = getPassFromCommandLineArgs(crackParams.pw)
+        targetCount = len(targets)
+    if not crackParams.no_pot:
+        # Anything cracked by an earlier run (or one running right now) doesn't need cracking again
+        potFile = crackParams.pot
+        crackFromPotFile(potFile)
+    if len(targets) == 0:
+        # The pot file already had every one of them, so there's no attack to run.
         startTime   = int(time.time())
-        crackedPass = crack_Dictionary(crackParams)
-        endTime     = int(time.time())
+        endTime     = startTime
+        removeCheckpoint(crackParams)
+        printResults(startTime, endTime, testedCombinations, crackedHashes)
+        return
+    startTime   = int(time.time())
+    crackedPass = ATTACK_MODES[pickAttackMode(crackParams)](crackParams)
+    endTime     = int(time.time())
     if crackedPass == False:
         printFailedResults(testedCombinations)
     else:
         printResults(startTime, endTime, testedCombinations, crackedPass)
 
+def pickAttackMode(crackParams):
+    # Works out which attack the options ask for
+    if crackParams.plan != None:
+        # User asked for an attack plan, which runs several of the others in turn.
+        return 'plan'
+    elif crackParams.index != None:
+        # User supplied a prebuilt index, so it's just a lookup per hash.
+        return 'index'
+    elif crackParams.mask != None:
+        # User supplied a mask, so only the characters it allows get tried in each position.
+        return 'mask'
+    elif crackParams.d == None:
+        # This is a brute force crack.
+        return 'brute'
+    else:
+        # User supplied a dictionary, so this is a dictionary crack.
+        return 'dictionary'
+
 def getPassFromCommandLineArgs(pw):
-    # Tests user input. If pw length = 32, then this should be an MD5 hash. Otherwise
-    # I expect it to be a file path. If it's a hash, I'll verify that all the characters
-    # are consistent with an MD5 hash (i.e. no unusual characters). If it's not a hash, I'll
-    # test to see if it's a valid file path. If it's a file, I'll grab the hash from the file contents.
-    if len(pw) == 32:
-        if validateMD5(pw):
-            return pw
-    elif path.isfile(pw):
-        pw = getPassFromHashFile(crackParams.pw)
-        return pw
+    # Tests user input. If it's a path to a file, I'll grab every hash from the file contents.
+    # Otherwise I expect it to be a single hash of the --hash-type I'm cracking (MD5 unless
+    # told otherwise) and I'll verify that all the characters are consistent with that kind
+    # of hash (i.e. right length, no unusual characters).
+    # Returns a set of raw 16-byte digests so each candidate only has to be hashed once
+    # no matter how many hashes I'm cracking.
+    if path.isfile(pw):
+        return getPassFromHashFile(pw)
+    elif hashBackend.parseTarget(pw) != None:
+        return {hashBackend.parseTarget(pw)}
     else:
-        # The file path was exactly 32 characters so it was impossible to tell if this was an MD5
-        # hash or a file path. Essentially... I'm confused. Maybe if you rename your hash file the path
-        # won't be 32 characters and I can go from there.
-        print(f'''Well, this is embarassing - I am unsure if {crackParams.pw} is an md5 hash or a path to a file. \n
-        My coding skills are no match. Would you mind trying a different hash or changing your filename slightly?''')
+        # Not a file and not a hash. Essentially... I'm confused.
+        clearTerminal()
+        print(f'''Well, this is embarassing - {pw} is neither an {hashBackend.name} hash nor a path to a file I can find. \n
+        Hashes must be {hashBackend.digestSize * 2} characters long and can only contain these characters: {string.hexdigits[:16]}''')
+        if hashBackend.salted:
+            print("        Salted hashes are written hash:salt, with $HEX[...] around salts that aren't plain text.")
         sys.exit()
 
-def validateMD5(pw):
-    # Simple test to ensure your 32-digit entry matches a standard MD5 format before I crack it.
-    validates = False
-    illegalCharacters = False
-    # Validate each character
+def validateHash(pw, digestSize=None):
+    # Simple test to ensure your entry matches the hex format of the hash type I'm cracking
+    # (32 digits for MD5 and NTLM, 40 for SHA-1, 64 for SHA-256) before I crack it.
+    # Pass digestSize=0 to accept a hex digest of any length.
+    if digestSize == None:
+        digestSize = hashBackend.digestSize
+    if len(pw) == 0 or len(pw) % 2 != 0 or (digestSize > 0 and len(pw) != digestSize * 2):
+        return False
     for i in pw.lower():
-        if (i in md5library) == False:
-            illegalCharacters = True
-            clearTerminal()
-            print(f"There seems to be an illegal character ({i}) in your MD5 hash. Please try again.")
-            sys.exit()
-            break
-    if illegalCharacters == False:
-        validates = True
-    if  validates == True:
-        return True
-    return False
+        if (i in string.hexdigits) == False:
+            return False
+    return True
 
 def getPassFromHashFile(hashFilePath):
-    # Reads the MD5 hashed password from user-supplied text file
-    # Returns pssword upon success, exits app on failure
+    # Reads the hashed passwords from a user-supplied text file, one hash per line.
+    # Blank lines are ignored and lines that aren't a --hash-type hash are skipped with a warning.
+    # Returns a set of raw digests upon success, exits app if I couldn't find a single hash
     clearTerminal()
-    pwRead = False
-    while pwRead == False:
-        try:
-            f = open(hashFilePath)
-            pw = (f.read())
-            f.close()
-            pwRead = True
-        except OSError:
-            clearTerminal()
-            print (f"Could not open/read file at {hashFilePath}. Please try again.")
-            sys.exit()
+    hashes      = set()
+    badLines    = 0
+    try:
+        with open(hashFilePath, 'r', encoding='utf8') as f:
+            for line in f:
+                line = line.strip()
+                if line == '':
+                    continue
+                target = hashBackend.parseTarget(line)
+                if target != None:
+                    hashes.add(target)
+                else:
+                    badLines += 1
+    except OSError:
+        clearTerminal()
+        print (f"Could not open/read file at {hashFilePath}. Please try again.")
+        sys.exit()
 
-    # Validate the MD5 contained within the file
-    if validateMD5(pw) == True:
-        return pw
-    else:
+    if badLines > 0:
+        print(f"{bcolors.YELLOW}Skipped {badLines:,d} line(s) in {hashFilePath} that aren't {hashBackend.name} hashes.{bcolors.NORMAL}")
+    if len(hashes) == 0:
         print(f"unable to validate the hash contained in {hashFilePath}. Please try again.")
         sys.exit()
+    return hashes
+
+def recordCrack(digest, testPW):
+    # Moves a cracked hash out of the target set and lets the user know about it right away
+    # instead of making them wait for the whole run to finish.
+    # Returns False if the hash was already cracked (e.g. the same word showed up twice)
+    if digest not in targets:
+        return False
+    if isinstance(testPW, str):
+        testPW = testPW.encode('utf_8')
+    targets.discard(digest)
+    crackedHashes[digest] = testPW
+    if potFile != None:
+        appendPotFile(potFile, digest, testPW)
+    if progressReporter != None:
+        progressReporter.cracked(digest, testPW)
+    else:
+        print(f"{bcolors.SUCCESS}Cracked {hashBackend.describe(digest)} : {displayPW(testPW)}{bcolors.NORMAL}  ({len(targets):,d} left)")
+    return True
+
+def displayPW(testPW):
+    # Candidates are bytes internally, this turns one back into something printable
+    return testPW.decode('utf_8', errors='replace')
 
 # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
 # Brute functions
@@ -227,135 +410,714 @@ def getPassFromHashFile(hashFilePath):
 
 def crack_BruteForce(crackParams):
     # Iterates through generated character combinations up to maxPassLength
-    # (defined on line 42 above) and tests them against user's hashed password.
-    global libraryList, pw, testedCombinations, testPW
-    pw = getPassFromCommandLineArgs(crackParams.pw)
-
-    # charCounts will track the characters to be tested in each character
-    # position of the temporary password. Since I can have up to maxPassLength characters,
-    # I build a maxPassLength-item list and initialize the first to 0 and the rest to -1.
-    # These values correspond to a character in our master library comparison
-    # string (abcdABCD1234><:... etc).
-    # Based on maxPassLength = 6, charCounts would initialize to:
-    #   charCounts[0] = 0
-    #   charCounts[1] = -1
-    #   charCounts[2] = -1
-    #   charCounts[3] = -1
-    #   charCounts[4] = -1
-    #   charCounts[5] = -1
-    for i in range(maxPassLength):
-        if i == 0:
-            charCounts.append(0)
-        else:
-            charCounts.append(-1)
+    # and tests them against user's hashed password.
+    global libraryList, testedCombinations, testPW, markovOrder
 
     # Create our master library string of all ascii alphanumeric characters and punctuation.
     # I'll iterate thru this list to build our brute force test combinations.
     libraryList = buildLibraryString()
 
-<<<<<<< HEAD
-    # I found that by shuffling the master comparison string I can sometimes increase
-    # the speed at which a match is found. For example if my library string is always
-    # (abc...ABC...123...~!@) and the user's password ends in a punctuation character,
-    # then I are guaranteed that execution will have to loop until I reach the
-    # punctuation portion of the master string. However, if I shuffle the master string
-    # (e.g., ~2c1@a3AB~!bC), there's a chance that I could hit that last character of the
-    # password sooner and shave off potentially millions of iterations. Of course,
-    # sometimes it increases the execution time, but that's the chance you have to take.  :)
-    # I have a 50/50 chance of speeding up the crack vs slowing it down. Those seem to be
-    # fair odds. To test this, run the same crack a few times and observe the differences.
-    # A 3-character pass can take up to 94^3 iterations to brute force without shuffling the
-    # character list. Via shuffling, cracking it can be brought down to as low as
-    # (94^2)+1 iterations.
-
-    random.shuffle(libraryList)
-
-    # Just in case this loop somehow gets away from me, I'm setting a max iteration time
-    # of the length of our character library to the power of [maxPassLength] digits
-    # in our hashed password.
-    maxIterations = len(libraryList)**maxPassLength
-
-    # Loop until I have found a matching password
-    while testedCombinations <= maxIterations: # Set a cap on execution time in case I bugged some logic
-        testedCombinations += 1 # increment our crack attempts count every time
-
-        # Build a character combination to hash and compare
-        testPW = buildTestPW()
-
-        # Hash and compare the generated combination
-        if hashAndCompareWord(testPW):
-            return testPW
-        else:
-            # Update the character counters and try again on the next loop iteration.
-            charCounts[0] = incrementCount(0)
-
-        # Dispay iteration count while cracking pw so user knows we're still working
-        if testedCombinations % 1000000 == 0:
-            clearTerminal()
-            leftToTry = maxIterations - testedCombinations
-            print(f"Combinations left: {leftToTry:,d}")
+    # I used to shuffle the master library string and hope the password's characters
+    # happened to land near the front. That's a coin flip: it's as likely to slow the
+    # crack down as speed it up, and no two runs ever went the same way.
+    # Now I learn which characters real passwords use, position by position and given the
+    # character before them, from a wordlist (--markov) and every password in the pot file.
+    # The keyspace then hands out the likely candidates of each length first, while still
+    # covering every combination exactly once. Most passwords turn up in the first small
+    # slice of the keyspace instead of somewhere random in the middle.
+    #
+    # With nothing to learn from (no --markov wordlist and an empty pot) every position
+    # would get the same fallback ranking anyway, so I skip the Markov shells and walk a
+    # plain keyspace in MARKOV_FALLBACK_ORDER instead, which hands out much bigger blocks.
+    #
+    # When resuming, the ordering has to be the exact one from the checkpoint or the saved
+    # keyspace indexes would point at different candidates (the pot file may have grown).
+    minLength = crackParams.min_length if crackParams.min_length != None else 1
+    maxLength = crackParams.max_length if crackParams.max_length != None else maxPassLength
+    if minLength < 1 or minLength > maxLength:
+        print(f"Brute force lengths have to be at least 1, with --min-length no bigger than --max-length.")
+        sys.exit()
+    if resumeState != None:
+        markovOrder = markovOrderFromJSON(resumeState['markovOrder'])
+    else:
+        markovOrder = trainMarkovModel(libraryList, maxLength, crackParams.markov, potFile, plainIfUntrained=True)
+
+    # The keyspace maps every index from 0 to len(libraryList)**maxLength (plus all the
+    # shorter lengths down to minLength) onto exactly one candidate, so there's nothing to
+    # keep track of between candidates except the index I'm on.
+    if markovOrder == None:
+        keyspace = Keyspace([plainCharacterOrder(libraryList)] * maxLength, minLength, maxLength)
+    else:
+        keyspace = MarkovKeyspace(libraryList, markovOrder, minLength, maxLength)
+    return crackKeyspace(crackParams, keyspace, 'brute')
+
+def crackKeyspace(crackParams, keyspace, mode):
+    # Tests every candidate in a keyspace (brute force or mask) against the user's hashes,
+    # either right here or spread across a pool of worker processes.
+    # mode is only used to label checkpoints so --resume knows what kind of run it was.
+    global testedCombinations, testPW
+    if crackParams.worker != None:
+        return workLeases(crackParams, lambda start, stop: crackKeyspaceLease(keyspace, start, stop))
+
+    # Pick up the list of index ranges that were already finished before a restart
+    completedRanges = []
+    if resumeState != None:
+        completedRanges = [tuple(r) for r in resumeState['completed']]
+
+    # If the user asked to coordinate, workers on other machines do the cracking
+    if crackParams.coordinator != None:
+        return coordinateLeases(crackParams, mode, keyspace.size, LEASE_KEYSPACE_SIZE, completedRanges)
+
+    # If the user asked for more than one worker, hand the keyspace off to a process pool
+    workers = crackParams.workers if crackParams.workers > 0 else multiprocessing.cpu_count()
+    if workers > 1:
+        return crackKeyspaceParallel(crackParams, keyspace, mode, workers, completedRanges)
+
+    # Loop through the keyspace a block at a time until I have cracked every hash. Every
+    # candidate in a block shares the same prefix, so the prefix only gets hashed once.
+    nextCheckpoint = time.monotonic() + crackParams.checkpoint_interval
+    start = index = 0
+    try:
+        with ProgressReporter(crackParams, keyspaceProgress(keyspace, completedRanges), keyspace.size):
+            for start, stop in missingRanges(keyspace.size, completedRanges):
+                index = start
+                for prefix, tails in keyspace.iterBlocks(start, stop):
+                    hits = hashAndCompareSuffixes(prefix, tails)
+                    for position, digest in hits:
+                        testPW = prefix + tails[position]
+                        recordCrack(digest, testPW)
+                    if len(targets) == 0:
+                        testedCombinations += hits[-1][0] + 1
+                        removeCheckpoint(crackParams)
+                        return crackedHashes
+                    testedCombinations += len(tails)
+                    index += len(tails)
+
+                    # An attack plan stage that's used up its budget stops here
+                    if budgetSpent():
+                        break
+
+                    # Every so often, save where I'm at so a crash doesn't cost days of work
+                    if crackParams.checkpoint_interval > 0 and time.monotonic() >= nextCheckpoint:
+                        saveCheckpoint(crackParams, mode, completed=addRange(completedRanges, start, index))
+                        nextCheckpoint = time.monotonic() + crackParams.checkpoint_interval
+                if budgetSpent():
+                    break
+                completedRanges = addRange(completedRanges, start, stop)
+    except KeyboardInterrupt:
+        saveCheckpoint(crackParams, mode, completed=addRange(completedRanges, start, index))
+        print(f"\nStopped. Run again with --resume to pick up where I left off.")
+        sys.exit()
+    removeCheckpoint(crackParams)
+    if len(crackedHashes) > 0:
+        return crackedHashes
+    return False
+
+def crackKeyspaceParallel(crackParams, keyspace, mode, workers, completedRanges):
+    # Splits the keyspace into index ranges and lets a pool of worker processes chew through
+    # them. Workers send back whatever they cracked along with how many candidates they
+    # actually tested, so testedCombinations still adds up to the real amount of work done.
+    # Once the last hash is cracked I set a shared stop flag, which makes every worker bail
+    # out at its next batch and stops me from handing out any more ranges.
+    # Ranges finish out of order, so checkpoints record every finished range rather than a
+    # single index. Anything still in flight when the run dies gets retested on resume.
+    global testedCombinations, testPW
+    stopEvent       = multiprocessing.Event()
+    nextCheckpoint  = time.monotonic() + crackParams.checkpoint_interval
+    progress        = ProgressReporter(crackParams, keyspaceProgress(keyspace, completedRanges), keyspace.size)
+    with multiprocessing.Pool(workers, initializer=bruteForceWorkerInit, initargs=(stopEvent, keyspace, targets, crackParams.hash_type)) as pool, progress:
+        ranges  = iterKeyspaceRanges(keyspace, workers, stopEvent, completedRanges)
+        results = pool.imap_unordered(bruteForceWorker, ranges)
+        try:
+            while True:
+                # A range can keep a worker busy for a minute, and an attack plan stage can
+                # run out of time in the meantime, so I don't just sit and wait for it
+                try:
+                    indexRange, hits, tested = results.next(timeout=0.1)
+                except multiprocessing.TimeoutError:
+                    if budgetSpent():
+                        stopEvent.set()
+                    continue
+                except StopIteration:
+                    break
+                testedCombinations += tested
+                for digest, testPW in hits:
+                    recordCrack(digest, testPW)
+                if len(targets) == 0 or budgetSpent():
+                    stopEvent.set()
+                    continue
+                completedRanges = addRange(completedRanges, indexRange[0], indexRange[1])
+
+                # Every so often, save the finished ranges so a crash doesn't cost days of work
+                if crackParams.checkpoint_interval > 0 and time.monotonic() >= nextCheckpoint:
+                    saveCheckpoint(crackParams, mode, completed=completedRanges)
+                    nextCheckpoint = time.monotonic() + crackParams.checkpoint_interval
+
+        except KeyboardInterrupt:
+            stopEvent.set()
+            pool.terminate()
+            saveCheckpoint(crackParams, mode, completed=completedRanges)
+            print(f"\nStopped. Run again with --resume to pick up where I left off.")
+            sys.exit()
+    removeCheckpoint(crackParams)
+    if len(crackedHashes) > 0:
+        return crackedHashes
     return False
-=======
-    # Request user's hashed password
-    pw      = getPass()
-
-    # I found that by shuffling the master comparison string I can sometimes increase 
-    # the speed at which a match is found. For example if my library string is always 
-    # (abc...ABC...123...~!@) and the user's password ends in a punctuation character, 
-    # then we are guaranteed that execution will have to loop until we reach the 
-    # punctuation portion of the master string. However, if I shuffle the master string 
-    # (~2c1@a3AB~!bC), there's a chance that we could hit that last character of the 
-    # password sooner and shave off potentially millions of iterations. Of course, 
-    # sometimes it increases the execution time, but that's the chance you have to take.  :)
-    random.shuffle(library)
-
-    # Loop until we have found a matching password
-    processingCount = 0
-    while passFound == False:
-        testPW  = buildTestPW()
-        m = hashlib.md5()
-        m.update(testPW.encode('utf_8'))
-        hashedPass = m.hexdigest()
-        # If the test pass matches the user's pass, we'll print the 
-        # results and exit the application
-        if hashedPass == pw:
-            passFound = True
-            printResults(startTime, testedCombos, testPW)
+
+def keyspaceProgress(keyspace, completedRanges):
+    # Builds the function a ProgressReporter calls to see how far through the keyspace I am:
+    # whatever was finished before a resume plus everything tested since.
+    alreadyDone     = sum(stop - start for start, stop in completedRanges)
+    countAtStart    = testedCombinations
+    return lambda: min(alreadyDone + testedCombinations - countAtStart, keyspace.size)
+
+def iterKeyspaceRanges(keyspace, workers, stopEvent, completedRanges=[]):
+    # Yields (start, stop) index ranges covering the whole keyspace, minus anything already
+    # finished before a resume. Ranges are small enough that every worker gets plenty of
+    # them (so nobody sits idle at the end of the run) but big enough that the pool overhead
+    # stays out of the picture. Once the stop flag is set I quit handing out new ranges.
+    # I only hear how many candidates were tested when a range comes back, so an attack
+    # plan stage with a candidate budget gets ranges small enough not to blow through it,
+    # even if that means ranges below the usual BATCH_SIZE floor.
+    rangeSize = -(-keyspace.size // (workers * 256))
+    rangeSize = max(Keyspace.BATCH_SIZE, min(rangeSize, Keyspace.BATCH_SIZE * 256))
+    if stageBudget != None and stageBudget.candidates > 0:
+        rangeSize = max(1, min(rangeSize, stageBudget.candidates // (workers * 16)))
+    for missingStart, missingStop in missingRanges(keyspace.size, completedRanges):
+        for start in range(missingStart, missingStop, rangeSize):
+            if stopEvent.is_set():
+                return
+            yield (start, min(start + rangeSize, missingStop))
+
+def bruteForceWorkerInit(stopEvent, keyspace, targetDigests, hashType):
+    # Runs once in each worker process to stash the shared bits it needs. Ctrl+C is left
+    # to the main process so it can write a checkpoint before shutting the pool down.
+    global workerStopEvent, workerKeyspace, targets, hashBackend
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    workerStopEvent = stopEvent
+    workerKeyspace  = keyspace
+    targets         = set(targetDigests)
+    hashBackend     = HASH_BACKENDS[hashType]
+
+def bruteForceWorker(indexRange):
+    # Tests one index range of the keyspace inside a worker process.
+    # Returns (indexRange, [(digest, candidate), ...] cracked in this range, number of candidates tested)
+    start, stop = indexRange
+    tested      = 0
+    cracked     = []
+    if workerStopEvent.is_set() or len(targets) == 0:
+        # Someone (maybe this very worker, in an earlier range) already finished the job
+        # while this range was waiting in the queue
+        return indexRange, cracked, tested
+    for prefix, tails in workerKeyspace.iterBlocks(start, stop):
+        if workerStopEvent.is_set():
+            break
+        hits = hashAndCompareSuffixes(prefix, tails)
+        for position, digest in hits:
+            targets.discard(digest)
+            cracked.append((digest, prefix + tails[position]))
+        if len(targets) == 0:
+            return indexRange, cracked, tested + hits[-1][0] + 1
+        tested += len(tails)
+    return indexRange, cracked, tested
+
+def addRange(ranges, start, stop):
+    # Adds [start, stop) to a sorted list of finished (start, stop) ranges and merges any
+    # that touch, so the list stays short no matter what order ranges finish in.
+    # Returns a new list, the one passed in is left alone
+    merged = []
+    for rangeStart, rangeStop in sorted(list(ranges) + [(start, stop)]):
+        if rangeStop <= rangeStart:
+            continue
+        if merged and rangeStart <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], rangeStop))
         else:
-            # Update the character counters and try again on the next loop iteration.
-            charCounts[0] = incrementCount(0)
-            testedCombos += 1
-            
-            # Dispay spinners while cracking pw so user knows we're still alive
-            if testedCombos%25000 == 0:
-                processingCount += 1
-                if processingCount == 4:
-                    processingCount = 0
-                clear()
-                if processingCount == 0:
-                    print("└ └ └ └ └ └ └")
-                elif processingCount  == 1:
-                    print("┘ ┘ ┘ ┘ ┘ ┘ ┘")
-                elif processingCount == 2:
-                    print("┐ ┐ ┐ ┐ ┐ ┐ ┐")
+            merged.append((rangeStart, rangeStop))
+    return merged
+
+def missingRanges(size, completedRanges):
+    # Yields the (start, stop) ranges of [0, size) that aren't in completedRanges
+    index = 0
+    for start, stop in addRange(completedRanges, 0, 0):
+        if start > index:
+            yield (index, min(start, size))
+        index = max(index, stop)
+    if index < size:
+        yield (index, size)
+
+# - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+# Mask functions
+# - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+
+# Built-in mask charsets, used as ?l, ?u, ?d etc. in a mask or custom charset
+MASK_CHARSETS = {
+    'l' : string.ascii_lowercase.encode('ascii'),
+    'u' : string.ascii_uppercase.encode('ascii'),
+    'd' : string.digits.encode('ascii'),
+    's' : (' ' + string.punctuation).encode('ascii'),
+    'a' : (string.ascii_lowercase + string.ascii_uppercase + string.digits + ' ' + string.punctuation).encode('ascii'),
+    'h' : b'0123456789abcdef',
+    'H' : b'0123456789ABCDEF',
+    'b' : bytes(range(256)),
+    }
+
+def crack_Mask(crackParams):
+    # Like brute force, but every position only gets the characters the mask allows.
+    # A mask like ?u?l?l?l?l?d?d (Capital, 4 lowercase, 2 digits) is a tiny fraction of the
+    # full 95^7 keyspace, so targeted guesses at common password shapes finish in minutes.
+    # Lengths from --min-length to --max-length use the first N positions of the mask.
+    keyspace = buildMaskKeyspace(crackParams, crackParams.mask)
+    clearTerminal()
+    print(f"Mask keyspace: {keyspace.size:,d} combinations")
+    return crackKeyspace(crackParams, keyspace, 'mask')
+
+def buildMaskKeyspace(crackParams, mask):
+    # Parses a mask (plus any custom charsets) into a Keyspace covering the lengths the user
+    # asked for with --min-length/--max-length, or just the full mask length by default.
+    customCharsets = [parseMask(charset, []) if charset != None else None for charset in getCustomCharsets(crackParams)]
+    positions = parseMask(mask, customCharsets)
+    minLength = crackParams.min_length if crackParams.min_length != None else len(positions)
+    maxLength = crackParams.max_length if crackParams.max_length != None else len(positions)
+    if maxLength > len(positions) or minLength < 1 or minLength > maxLength:
+        print(f"Mask {mask} has {len(positions)} positions, so lengths have to be between 1 and {len(positions)}.")
+        sys.exit()
+    return Keyspace(positions, minLength, maxLength)
+
+def compileHybridMask(keyspace, prepend):
+    # Builds a rule generator for the mangler pipeline that glues every candidate in a mask
+    # keyspace onto each wordlist entry: word + mask (or mask + word when prepending).
+    # The keyspace is walked block by block for each word, so the full wordlist x mask
+    # product never exists in memory.
+    # Appending: the word plus the head of the mask is the shared prefix, so the hashed
+    #   word gets reused for every tail in the block.
+    # Prepending: the word comes last, so only the head of the mask can be shared and each
+    #   tail gets the word stuck on the end of it.
+    def generate_hybridAppend(testPW):
+        for prefix, tails in keyspace.iterBlocks(0, keyspace.size):
+            yield testPW + prefix, tails
+
+    def generate_hybridPrepend(testPW):
+        for prefix, tails in keyspace.iterBlocks(0, keyspace.size):
+            yield prefix, [tail + testPW for tail in tails]
+
+    if prepend:
+        return generate_hybridPrepend
+    return generate_hybridAppend
+
+def getCustomCharsets(crackParams):
+    # Returns the four user-defined charsets (?1 - ?4), None for any that weren't given
+    return [crackParams.custom_charset1, crackParams.custom_charset2, crackParams.custom_charset3, crackParams.custom_charset4]
+
+def parseMask(mask, customCharsets):
+    # Turns a mask string into a list with the allowed characters (bytes) for each position.
+    # ?l ?u ?d ?s ?a ?h ?H ?b are the built-in charsets, ?1 - ?4 are the custom ones, ?? is a
+    # literal '?' and any other character stands for itself.
+    # When customCharsets is empty I'm parsing a custom charset itself, so everything gets
+    # squashed into one position instead.
+    positions = []
+    mask = mask.encode('utf_8')
+    i = 0
+    while i < len(mask):
+        character = mask[i:i+1]
+        i += 1
+        if character == b'?':
+            if i >= len(mask):
+                print(f"Mask {mask.decode('utf_8')} ends with a '?' that isn't followed by a charset.")
+                sys.exit()
+            charsetName = chr(mask[i])
+            i += 1
+            if charsetName == '?':
+                positions.append(b'?')
+            elif charsetName in MASK_CHARSETS:
+                positions.append(MASK_CHARSETS[charsetName])
+            elif charsetName in '1234' and customCharsets and customCharsets[int(charsetName) - 1] != None:
+                positions.append(customCharsets[int(charsetName) - 1])
+            else:
+                print(f"Mask {mask.decode('utf_8')} uses ?{charsetName}, which isn't a charset I know about.")
+                sys.exit()
+        else:
+            positions.append(character)
+    if customCharsets == []:
+        # Custom charset: one position holding every character, without repeats
+        return bytes(dict.fromkeys(b''.join(positions)))
+    return positions
+
+class Keyspace:
+    # Maps every integer index in [0, size) onto exactly one candidate password as bytes.
+    # Each character position gets its own character set, so an index is just a mixed-radix
+    # number where the last position is the least significant digit. All the shortest
+    # candidates come first, then the next length up, and so on to maxLength.
+    #
+    # Since any index can be turned straight into a candidate, a run can be split into
+    # index ranges, resumed from an index or handed off to another process, and nothing
+    # has to be rebuilt from scratch for each candidate. The last few positions of every
+    # length are pre-joined into a "tail table" once, so walking a range is just gluing
+    # one prefix onto a slice of that table.
+
+    TAIL_TABLE_LIMIT    = 1 << 16   # Max number of pre-joined tails kept per length
+    BATCH_SIZE          = 1 << 16   # Default number of candidates handed out per batch
+
+    def __init__(self, charsets, minLength=1, maxLength=None):
+        # charsets is a list with one string (or bytes) of characters per position
+        self.positions  = []
+        for charset in charsets:
+            if isinstance(charset, str):
+                charset = charset.encode('utf_8')
+            elif not isinstance(charset, bytes):
+                charset = ''.join(charset).encode('utf_8')
+            self.positions.append([charset[i:i+1] for i in range(len(charset))])
+        self.radices    = [len(position) for position in self.positions]
+        self.minLength  = max(minLength, 1)
+        self.maxLength  = len(self.positions) if maxLength == None else maxLength
+
+        # Work out where each candidate length starts in the index space
+        self.lengthOffsets  = {}
+        self.lengthCounts   = {}
+        self.size           = 0
+        for length in range(self.minLength, self.maxLength + 1):
+            count = 1
+            for radix in self.radices[:length]:
+                count *= radix
+            self.lengthOffsets[length]  = self.size
+            self.lengthCounts[length]   = count
+            self.size                  += count
+        self.tailTables = {}
+
+    def tailTable(self, length):
+        # Returns (tailWidth, table) for the given length, where table holds every
+        # combination of the last tailWidth positions already joined into bytes.
+        if length not in self.tailTables:
+            tailWidth   = 1
+            tailCount   = self.radices[length - 1]
+            while tailWidth < length and tailCount * self.radices[length - tailWidth - 1] <= self.TAIL_TABLE_LIMIT:
+                tailWidth  += 1
+                tailCount  *= self.radices[length - tailWidth]
+            table = [b''.join(t) for t in itertools.product(*self.positions[length - tailWidth:length])]
+            self.tailTables[length] = (tailWidth, table)
+        return self.tailTables[length]
+
+    def locate(self, index):
+        # Returns (length, offset within that length) for a keyspace index
+        if index < 0 or index >= self.size:
+            raise IndexError(f"Keyspace index {index} is out of range")
+        for length in range(self.minLength, self.maxLength + 1):
+            if index < self.lengthOffsets[length] + self.lengthCounts[length]:
+                return length, index - self.lengthOffsets[length]
+
+    def buildCandidate(self, offset, firstPosition, lastPosition):
+        # Turns a mixed-radix number into the characters for positions [firstPosition, lastPosition)
+        characters = []
+        for position in range(lastPosition - 1, firstPosition - 1, -1):
+            offset, digit = divmod(offset, self.radices[position])
+            characters.append(self.positions[position][digit])
+        characters.reverse()
+        return b''.join(characters)
+
+    def candidate(self, index):
+        # Returns the candidate at a given keyspace index
+        length, offset = self.locate(index)
+        return self.buildCandidate(offset, 0, length)
+
+    def iterBlocks(self, start, stop):
+        # Walks keyspace indexes [start, stop) and yields (prefix, tails) pairs. Every
+        # candidate in the block is prefix + tail, so callers that can reuse work on a
+        # shared prefix get it for free.
+        stop = min(stop, self.size)
+        for length in range(self.minLength, self.maxLength + 1):
+            lengthStart = self.lengthOffsets[length]
+            lengthStop  = lengthStart + self.lengthCounts[length]
+            if stop <= lengthStart:
+                break
+            if start >= lengthStop:
+                continue
+            tailWidth, table = self.tailTable(length)
+            tailCount       = len(table)
+            offset          = max(start, lengthStart) - lengthStart
+            lastOffset      = min(stop, lengthStop) - lengthStart
+            headIndex, tailStart = divmod(offset, tailCount)
+            while offset < lastOffset:
+                tailStop = min(tailCount, tailStart + lastOffset - offset)
+                prefix   = self.buildCandidate(headIndex, 0, length - tailWidth)
+                yield prefix, table[tailStart:tailStop]
+                offset     += tailStop - tailStart
+                headIndex  += 1
+                tailStart   = 0
+
+    def iterBatches(self, start, stop, batchSize=BATCH_SIZE):
+        # Walks keyspace indexes [start, stop) and yields lists of at most batchSize candidates
+        batch = []
+        for prefix, tails in self.iterBlocks(start, stop):
+            if prefix:
+                batch.extend([prefix + tail for tail in tails])
+            else:
+                batch.extend(tails)
+            while len(batch) >= batchSize:
+                yield batch[:batchSize]
+                batch = batch[batchSize:]
+        if batch:
+            yield batch
+
+# - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+# Markov functions
+# - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+
+# Order I fall back on for characters no training password ever used
+MARKOV_FALLBACK_ORDER = 'aeionrlstmcdyhubkgpjfwvzxq1203945867' + 'AEIONRLSTMCDYHUBKGPJFWVZXQ' + '!.@_-#$* ?&+=/,%^()[]{}<>:;~`|"\'\\'
+
+class MarkovKeyspace(Keyspace):
+    # Same keyspace as Keyspace with one charset in every position (so the same size and
+    # the same lengths in the same order), but inside each length the candidates come out
+    # most-likely-first according to a character-level Markov model.
+    #
+    # The model ranks every character for each position given the character before it
+    # (order[position][previous character], b'' for the first position). A candidate is
+    # then just a tuple of ranks, one per position. Tuples are handed out in "shells": shell
+    # k holds every tuple whose worst rank is exactly k, so all the candidates built from
+    # each position's top 2 choices come right after the single top-1 candidate, then the
+    # top 3, and so on. Shell k of length L holds (k+1)^L - k^L tuples and starts at
+    # offset k^L, and inside a shell tuples are grouped by the first position j holding a
+    # k, which makes k^j * (k+1)^(L-1-j) of them. That's all it takes to turn any index
+    # into a candidate and back, so ranges can still be split up, resumed and handed to
+    # worker processes like any other keyspace.
+    #
+    # Blocks: the last rank usually just counts up from 0 to k, so blocks are a prefix plus
+    # a slice of the ranked list for the last position. When the first k is in the last
+    # position, the second to last rank counts instead and the tails are 2 characters.
+
+    def __init__(self, charset, order, minLength=1, maxLength=None):
+        super().__init__([charset] * maxLength, minLength, maxLength)
+        self.order      = order
+        self.rankTables = None
+        self.pairTables = {}
+
+    def locateShell(self, length, offset):
+        # Returns (k, j, offset within that group) for an offset within one length
+        k = int(round(offset ** (1.0 / length)))
+        while k ** length > offset:
+            k -= 1
+        while (k + 1) ** length <= offset:
+            k += 1
+        within = offset - k ** length
+        for j in range(length):
+            count = k ** j * (k + 1) ** (length - 1 - j)
+            if within < count:
+                return k, j, within
+            within -= count
+
+    def shellRanks(self, length, k, j, within):
+        # Turns a position in group j of shell k back into one rank per position
+        ranks       = [0] * length
+        ranks[j]    = k
+        for position in range(length - 1, j, -1):
+            within, ranks[position] = divmod(within, k + 1)
+        for position in range(j - 1, -1, -1):
+            within, ranks[position] = divmod(within, k)
+        return ranks
+
+    def rankedCandidate(self, ranks):
+        # Turns one rank per position into the candidate's characters
+        characters  = []
+        previous    = b''
+        for position, rank in enumerate(ranks):
+            previous = self.order[position][previous][rank]
+            characters.append(previous)
+        return b''.join(characters)
+
+    def candidate(self, index):
+        # Returns the candidate at a given keyspace index
+        length, offset  = self.locate(index)
+        k, j, within    = self.locateShell(length, offset)
+        return self.rankedCandidate(self.shellRanks(length, k, j, within))
+
+    def index(self, candidate):
+        # Returns the keyspace index of a candidate, i.e. how many candidates get tried
+        # before it. Handy for seeing how well a model would have done on known passwords.
+        if self.rankTables == None:
+            self.rankTables = [{previous : {character : rank for rank, character in enumerate(ranked)}
+                                for previous, ranked in positionOrder.items()} for positionOrder in self.order]
+        length      = len(candidate)
+        ranks       = []
+        previous    = b''
+        for position in range(length):
+            character = candidate[position:position + 1]
+            ranks.append(self.rankTables[position][previous][character])
+            previous = character
+        k       = max(ranks)
+        j       = ranks.index(k)
+        high    = 0
+        for rank in ranks[:j]:
+            high = high * k + rank
+        low     = 0
+        for rank in ranks[j + 1:]:
+            low = low * (k + 1) + rank
+        offset  = k ** length + sum(k ** i * (k + 1) ** (length - 1 - i) for i in range(j))
+        offset += high * (k + 1) ** (length - 1 - j) + low
+        return self.lengthOffsets[length] + offset
+
+    def pairTable(self, length, previous, k):
+        # Tails for blocks whose first k is in the last position: every second-to-last
+        # character ranked below k, each followed by the last position's rank k character.
+        # Only the current shell's tables are kept around.
+        if self.pairTables.get('shell') != (length, k):
+            self.pairTables = {'shell' : (length, k)}
+        if previous not in self.pairTables:
+            lastOrder = self.order[length - 1]
+            self.pairTables[previous] = [c + lastOrder[c][k] for c in self.order[length - 2][previous][:k]]
+        return self.pairTables[previous]
+
+    def iterBlocks(self, start, stop):
+        # Walks keyspace indexes [start, stop) and yields (prefix, tails) pairs where every
+        # candidate in the block is prefix + tail, same as Keyspace.iterBlocks.
+        # A shell block is only up to k + 1 candidates, a few dozen on average, which is far
+        # too small for batch hashing (the NumPy backend wants MIN_BATCH at once) and leaves
+        # the per-block bookkeeping costing more than the hashing. So blocks get joined into
+        # batches of CANDIDATE_BATCH_SIZE whole candidates, handed out with an empty prefix.
+        batch = []
+        for prefix, tails in self.iterShellBlocks(start, stop):
+            if prefix:
+                batch.extend([prefix + tail for tail in tails])
+            else:
+                batch.extend(tails)
+            if len(batch) >= CANDIDATE_BATCH_SIZE:
+                yield b'', batch
+                batch = []
+        if batch:
+            yield b'', batch
+
+    def iterShellBlocks(self, start, stop):
+        # The blocks themselves, in index order. Inside a group (same k and j) the ranks in
+        # front of the counting position just tick over like an odometer (radix k before j,
+        # k + 1 after it), so I only work out the ranks from scratch at the start of a group.
+        stop = min(stop, self.size)
+        for length in range(self.minLength, self.maxLength + 1):
+            lengthStart = self.lengthOffsets[length]
+            lengthStop  = lengthStart + self.lengthCounts[length]
+            if stop <= lengthStart:
+                break
+            if start >= lengthStop:
+                continue
+            offset      = max(start, lengthStart) - lengthStart
+            lastOffset  = min(stop, lengthStop) - lengthStart
+            if length == 1:
+                # Shell k is just the rank k character
+                yield b'', self.order[0][b''][offset:lastOffset]
+                continue
+            ranks = None
+            while offset < lastOffset:
+                if ranks == None:
+                    k, j, within = self.locateShell(length, offset)
+                    ranks = self.shellRanks(length, k, j, within)
+                # The last rank counts from 0 to k, unless the first k is in the last
+                # position, then the second to last rank counts from 0 to k - 1
+                counting = length - 1 if j < length - 1 else length - 2
+                if counting == length - 1:
+                    prefix  = self.rankedCandidate(ranks[:-1])
+                    low     = ranks[-1]
+                    high    = min(k + 1, low + lastOffset - offset)
+                    tails   = self.order[length - 1][prefix[-1:]][low:high]
+                    full    = high == k + 1
                 else:
-                    print("┌ ┌ ┌ ┌ ┌ ┌ ┌")    
-                
->>>>>>> 8573649931b72d2493a8590358ab30f36f2a5c35
-
-def buildTestPW():
-    # Concatenates a test password based on the count values in each character space
-    testPW = ''
-    for j in charCounts:
-        if j >= 0:
-            testPW += libraryList[j]
-    return testPW
+                    prefix  = self.rankedCandidate(ranks[:-2])
+                    low     = ranks[-2]
+                    high    = min(k, low + lastOffset - offset)
+                    tails   = self.pairTable(length, prefix[-1:], k)[low:high]
+                    full    = high == k
+                yield prefix, tails
+                offset += high - low
+                if not full:
+                    continue
+
+                # Next block: reset the counting rank and carry into the ones in front of it
+                ranks[counting] = 0
+                position = counting - 1
+                while position >= 0:
+                    if position != j:
+                        ranks[position] += 1
+                        if ranks[position] < (k + 1 if position > j else k):
+                            break
+                        ranks[position] = 0
+                    position -= 1
+                if position < 0:
+                    # Ran off the end of the group, so the next one gets located from scratch
+                    ranks = None
+
+def trainMarkovModel(charset, maxLength, wordlistPaths, potPath, plainIfUntrained=False):
+    # Counts which characters passwords use at each position, given the character before
+    # them, from the given wordlists plus every cracked password in the pot file. Every
+    # character in the charset then gets ranked for every (position, previous character):
+    # by how often it followed that character there, then how often it showed up in that
+    # position at all, then how often it showed up anywhere, then MARKOV_FALLBACK_ORDER.
+    # Returns order[position][previous character] -> list of 1-byte characters, best first,
+    # or None if plainIfUntrained is set and there was nothing to train on
+    charset     = [c.encode('utf_8') if isinstance(c, str) else c for c in charset]
+    following   = collections.Counter()
+    positional  = collections.Counter()
+    overall     = collections.Counter()
+    words       = 0
+
+    def train(batch):
+        following.update((i, word[i - 1:i], word[i:i + 1]) for word in batch for i in range(min(len(word), maxLength)))
+        positional.update((i, word[i:i + 1]) for word in batch for i in range(min(len(word), maxLength)))
+        overall.update(word[i:i + 1] for word in batch for i in range(len(word)))
+
+    for wordlistPath in wordlistPaths or []:
+        try:
+            for batch, _ in iterWordlistBatches(wordlistPath):
+                train(batch)
+                words += len(batch)
+        except OSError:
+            print(f"Could not open/read Markov training wordlist at {wordlistPath}. Please try again.")
+            sys.exit()
+    if potPath != None:
+        cracked = list(loadPotFile(potPath).values())
+        train(cracked)
+        words += len(cracked)
+
+    if words == 0 and plainIfUntrained:
+        return None
+
+    fallback    = {c.encode('utf_8') : rank for rank, c in enumerate(MARKOV_FALLBACK_ORDER)}
+    lastRank    = len(fallback)
+    order       = []
+    for position in range(maxLength):
+        positionOrder = {}
+        for previous in [b''] + charset:
+            if (position == 0) != (previous == b''):
+                continue
+            positionOrder[previous] = sorted(charset, key=lambda c: (-following[position, previous, c], -positional[position, c],
+                                                                     -overall[c], fallback.get(c, lastRank)))
+        order.append(positionOrder)
+    if words > 0:
+        print(f"Trained the Markov model on {words:,d} passwords.")
+    return order
+
+def plainCharacterOrder(charset):
+    # The charset as one string in MARKOV_FALLBACK_ORDER, for brute forcing without a model
+    charset     = [c.decode('utf_8') if isinstance(c, bytes) else c for c in charset]
+    fallback    = {c : rank for rank, c in enumerate(MARKOV_FALLBACK_ORDER)}
+    lastRank    = len(fallback)
+    return ''.join(sorted(charset, key=lambda c: fallback.get(c, lastRank)))
+
+def markovOrderToJSON(order):
+    # Checkpoints are JSON, so the ranked characters get stored as strings
+    if order == None:
+        return None
+    return [{previous.decode('latin_1') : b''.join(ranked).decode('latin_1') for previous, ranked in positionOrder.items()}
+            for positionOrder in order]
+
+def markovOrderFromJSON(stored):
+    # Undoes markovOrderToJSON
+    if stored == None:
+        return None
+    order = []
+    for positionOrder in stored:
+        order.append({previous.encode('latin_1') : [c.encode('latin_1') for c in ranked] for previous, ranked in positionOrder.items()})
+    return order
 
 def buildLibraryString():
     # Concatenates a string of all available ascii characters to use for
     # sequential testing against the user's password.
 
-<<<<<<< HEAD
     global libraryList, libraryString
     for x in string.ascii_lowercase:
         libraryList.append(x)
@@ -366,64 +1128,6 @@ def buildLibraryString():
     libraryList.append(' ')
     for x in string.punctuation:
         libraryList.append(x)
-=======
-    # Display total execution time
-    duration = endTime - startTime
-    if duration <= 0:
-        days   = 0
-        hours  = 0
-        mins   = 0
-        secs   = 0
-    else:
-        days   = floor(duration / 86400)
-        hours  = floor((duration % 86400) / 3600)
-        mins   = floor(((duration % 86400) % 3600) / 60)
-        secs   = ((duration % 86400) % 3600) % 60
-    print(f"Total time: {bcolors.YELLOW}{days} days {hours} hours {mins} mins {secs} secs\n\n{bcolors.NORMAL}")
-
-def getPass():
-    # Collect and validate user password input. Ensures password length is 
-    # between 1 and maxPassLength characters in length and that all characters fall within 
-    # the allowed characters as defined in the 'library' string.
-
-    clear()
-    passlength = 0
-    validates = False
-    pw = ''
-    md5library = []
-
-    for x in string.ascii_lowercase:
-        md5library.append(x)
-    for x in string.digits:
-        md5library.append(x)
-    md5String = ''
-    for i in md5library:
-        md5String += i
-    
-    # Loop until password is the correct length
-    while ((passlength != 32) or validates == False):
-        if passlength != 32:
-            print(f"Hashed pass must be 32 alphanumeric characters in length")
-        if validates == False:
-            print (f"Pass can only contain these characters: {md5String}")
-        pw = input("What is the hashed password?\n")
-        passlength = len(pw)
-
-        # Validate all characters in the password to ensure they are allowed.
-        if passlength > 0:
-            illegalCharacters = False
-            for i in pw.lower():
-                if (i in md5library) == False:
-                    illegalCharacters = True
-                    clear()
-                    print(f"There seems to be an illegal character ({i}). Please try again.")
-                    break
-            if illegalCharacters == False:
-                validates = True
-        else:
-            clear()
-    return pw.lower()
->>>>>>> 8573649931b72d2493a8590358ab30f36f2a5c35
 
     # Build a formatted display version of the library list as a string
     libraryString = ''
@@ -433,95 +1137,544 @@ def getPass():
     # Return the library list
     return libraryList
 
-def buildMD5Library():
-    # Quick routine to build an ASCII list of characters for brute force testing
-    md5library = []
-    for x in string.ascii_lowercase:
-        md5library.append(x)
-    for x in string.digits:
-        md5library.append(x)
-    return md5library
-
-def buildMD5tring():
-    # Builds a display version of acceptable MD5 hash characters
-    # Used for notifying user of acceptable characters when submitting an MD5 hash
-    # via thecommand line.
-    md5String = ''
-    for i in md5library:
-        md5String += i
-    return md5String
-
-def incrementCount(digit):
-    # This function keeps track of what characters I've tested. I start with a
-    # list of maxPassLength characters (the max allowable password length) and each value
-    # starts at -1, except for the first character, which starts at 0. As each
-    # new password is tested, this function is called to increment the value of
-    # the character tested. Once the character count reaches the end of all possible
-    # characters, it is set back to 0 and the next character is # incremented from
-    # -1 to 0 and I'll start the process over again. This is a nested function, so
-    # if the current character count exceeds the max, it calls itself to increment
-    # the next character in the sequence.
-
-    newValue = 0
-    max = len(libraryList)
-    currentValue = charCounts[digit]
-
-    # Check to see if I're on the last character in the test library string. If so,
-    # then I've exhausted all possible combinations and still have no solution. At
-    # that point I need to exit and go sulk in the corner for about 20 minutes. Otherwise
-    # I need to set the counter back to 0 for this digit and increment the next
-    # digit by 1 and keep working.
-    if (currentValue == -1):
-        newValue = currentValue + 1
-    elif (currentValue + 1) % max != 0:
-        newValue = currentValue + 1
-    else:
-        if (digit == maxPassLength-1):
-            print("I've tried everything with no luck. <Sad panda>")
-            userPause('Press any key to exit.')
-            sys.exit()
-        nextCharacter = digit + 1
-        charCounts[nextCharacter] = incrementCount(nextCharacter)
-    return newValue
-
 # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
 # Dictionary functions
 # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
 
 def crack_Dictionary(crackParams):
-    # Returns the cracked password if successful, otherwise returns False
-    global pw, testedCombinations, testedPWSet, testPW, manglerRules
-    pw = getPassFromCommandLineArgs(crackParams.pw)
+    # Returns the cracked hashes if successful, otherwise returns False
+    global testedCombinations, testPW, manglerRules
     clearTerminal()
+    buildManglerPipeline(crackParams)
+    if crackParams.worker != None:
+        return workLeases(crackParams, lambda start, stop: crackDictionaryLease(crackParams, start, stop))
+    if crackParams.coordinator != None:
+        # Leases are ranges of word numbers, which only compiled wordlists have
+        if not isCompiledWordlist(crackParams.d):
+            print(f"Distributed dictionary cracks need a compiled wordlist. Run --compile-wordlist on {crackParams.d} first.")
+            sys.exit()
+        completedRanges = []
+        if resumeState != None:
+            completedRanges = [tuple(r) for r in resumeState.get('completed', [(0, resumeState['offset'])])]
+        return coordinateLeases(crackParams, 'dictionary', getWordlistSize(crackParams.d), LEASE_WORDLIST_SIZE, completedRanges)
+
+    # Stream the wordlist in batches of raw byte words and test each batch. I always test the
+    # raw word from the wordlist without any mangling first, then I pass that word into the
+    # mangler function and test the mangled values for a match.
+    # Each batch comes with the byte offset right after its last line (or the number of the
+    # next word in a compiled wordlist), which is what the checkpoint records so resuming
+    # seeks straight back to the next untested batch.
+    offset = 0
+    if resumeState != None:
+        offset = resumeState['offset']
+
+    # If the user asked for more than one worker, reading, mangling and hashing each get
+    # their own processes so the disk and the hasher are never waiting on each other
+    workers = crackParams.workers if crackParams.workers > 0 else multiprocessing.cpu_count()
+    if workers > 1:
+        return crackDictionaryPipeline(crackParams, offset, workers)
+
+    nextCheckpoint = time.monotonic() + crackParams.checkpoint_interval
+    try:
+        with ProgressReporter(crackParams, lambda: offset, getWordlistSize(crackParams.d)):
+            for words, batchEndOffset in iterWordlistBatches(crackParams.d, offset, lengthRange=crackParams.word_length, shard=crackParams.shard):
+                crackDictionaryBatch(words)
+                offset = batchEndOffset
+
+                # If a mangled word matches, it's already been reported. Once every hash
+                # is cracked (or an attack plan stage's budget is used up), stop iteration
+                # and print results.
+                if len(targets) == 0 or budgetSpent():
+                    break
+
+                # Every so often, save where I'm at so a crash doesn't cost days of work
+                if crackParams.checkpoint_interval > 0 and time.monotonic() >= nextCheckpoint:
+                    saveCheckpoint(crackParams, 'dictionary', offset=offset)
+                    nextCheckpoint = time.monotonic() + crackParams.checkpoint_interval
+    except OSError:
+        print (f"Could not open/read wordlist at {crackParams.d}. Please try again.")
+        sys.exit()
+    except KeyboardInterrupt:
+        # The current batch may only be partly tested, so the checkpoint points back at it
+        saveCheckpoint(crackParams, 'dictionary', offset=offset)
+        print(f"\nStopped. Run again with --resume to pick up where I left off.")
+        sys.exit()
+
+    # Either everything is cracked or I've exhausted our wordlist
+    removeCheckpoint(crackParams)
+    reportCandidateFilter()
+    if len(crackedHashes) > 0:
+        return crackedHashes
+    return False
+
+def buildManglerPipeline(crackParams):
+    # Sets up manglerPipeline from the -m flags, the rules file and the hybrid masks, in
+    # that order, so every dictionary-based mode generates the exact same candidates.
+    # --mangled-only is ignored with no manglers, or there'd be nothing left to test.
+    global candidateFilter, mangledOnly
+    candidateFilter = CandidateFilter(crackParams.dedup_mb) if crackParams.dedup_mb > 0 else None
     if crackParams.m != None:
         unpackMangleRules(crackParams.m)
+    compileManglerRules()
+    if crackParams.rules != None:
+        manglerPipeline.append(warmLoad('rules', crackParams.rules, compileRuleFile))
+    if crackParams.append_mask != None:
+        manglerPipeline.append(compileHybridMask(buildMaskKeyspace(crackParams, crackParams.append_mask), False))
+    if crackParams.prepend_mask != None:
+        manglerPipeline.append(compileHybridMask(buildMaskKeyspace(crackParams, crackParams.prepend_mask), True))
+    mangledOnly = crackParams.mangled_only and len(manglerPipeline) > 0
 
-    # Open wordlist file and iterate through all entries. I always test the raw word from the wordlist
-    # without any mangling first. If I don't have match, then I pass that word into the mangler
-    # function and test and mangled values for a match.
-    with open(crackParams.d, "r", encoding='utf8') as wordList:
-        for testPW in wordList.readlines():
-            testPW = testPW.strip()
-            # Generate mangled version of the word for testing based on rules
-            # and convert to a set so I don't waste our time testing duplicate
-            # words generated from the various rules.
-            mangledPWSet = set(getMangledPermutations(testPW))
-            for mangledWord in mangledPWSet:
-                testedCombinations += 1
-                # If mangled word matches, stop iteration and print results.
-                if hashAndCompareWord(mangledWord):
-                    wordList.close()
-                    return mangledWord
-
-                # Dispay iteration count while cracking pw so user knows I'm still working
-                if testedCombinations % 1000000 == 0:
-                    clearTerminal()
-                    print(f"Combinations tested: {testedCombinations:,d}")
-        # I've exhausted our wordlist and still haven't found a matching hash
-        wordList.close()
+def iterWordlistBatches(wordlistPath, offset=0, batchSize=WORDLIST_BATCH_SIZE, lengthRange=None, shard=None):
+    # Streams a wordlist from disk in big binary chunks and splits it into lines without ever
+    # decoding anything, so memory stays flat no matter how big the file is. Leading and
+    # trailing whitespace (including Windows CRLF endings) is stripped and blank lines are
+    # dropped, same as the old readlines() loop did.
+    # Compiled wordlists (--compile-wordlist) are handed off to iterCompiledWordlistBatches,
+    # and there offset is a word number instead of a byte offset. lengthRange is an optional
+    # (shortest, longest) pair of word lengths to keep. Sharding needs a compiled wordlist.
+    # Yields (list of words as bytes, byte offset just past the last line in the batch)
+    if isCompiledWordlist(wordlistPath):
+        yield from iterCompiledWordlistBatches(wordlistPath, offset, batchSize, lengthRange, shard)
+        return
+    if shard != None:
+        print(f"Sharding needs a compiled wordlist. Run --compile-wordlist on {wordlistPath} first.")
+        sys.exit()
+    if warmCache != None and path.getsize(wordlistPath) <= WARM_WORDLIST_LIMIT:
+        # Between crack() jobs, small text wordlists stay in memory already split into batches
+        for words, batchEndOffset in warmLoad('wordlist', wordlistPath, lambda wordlistPath: list(iterTextWordlistBatches(wordlistPath))):
+            if batchEndOffset <= offset:
+                continue
+            if lengthRange != None:
+                words = [word for word in words if lengthRange[0] <= len(word) <= lengthRange[1]]
+            yield words, batchEndOffset
+        return
+    yield from iterTextWordlistBatches(wordlistPath, offset, batchSize, lengthRange)
+
+def iterTextWordlistBatches(wordlistPath, offset=0, batchSize=WORDLIST_BATCH_SIZE, lengthRange=None):
+    # The part of iterWordlistBatches that actually reads a text wordlist
+    with open(wordlistPath, 'rb') as wordList:
+        wordList.seek(offset)
+        leftover = b''
+        while True:
+            chunk = wordList.read(WORDLIST_CHUNK_SIZE)
+            if not chunk:
+                # Last line of the file might not end in a newline
+                lines = [leftover] if leftover else []
+                leftover = b''
+            else:
+                chunk = leftover + chunk
+                lastNewline = chunk.rfind(b'\n')
+                if lastNewline < 0:
+                    leftover = chunk
+                    continue
+                lines = chunk[:lastNewline].split(b'\n')
+                leftover = chunk[lastNewline + 1:]
+            for i in range(0, len(lines), batchSize):
+                batch = lines[i:i + batchSize]
+                for line in batch:
+                    offset += len(line) + 1
+                words = [line.strip() for line in batch]
+                if lengthRange != None:
+                    yield [word for word in words if word and lengthRange[0] <= len(word) <= lengthRange[1]], offset
+                else:
+                    yield [word for word in words if word], offset
+            if not chunk:
+                return
+
+# - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+# Compiled wordlist functions
+# - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+
+WORDLIST_MAGIC      = b'ETTUWRD1'
+WORDLIST_HEADER     = struct.Struct('<8sQQ')    # Magic, number of words, number of length buckets
+WORDLIST_BUCKET     = struct.Struct('<HQQ')     # Word length, number of its first word, file offset of its words
+
+def compileWordlist(crackParams):
+    # Turns a text wordlist (-d) into the compiled format so dictionary runs never have to
+    # strip or split a line again:
+    #   header, then one bucket entry per word length, then each bucket's words back to back.
+    # Every word in a bucket is the same length, so the bucket entry is the length prefix for
+    # the whole run of words and finding word n is just multiplication. Words are numbered
+    # shortest bucket first, which is what checkpoints, --word-length and --shard go by.
+    # Duplicates are dropped (the first one wins, so a popularity-sorted list stays sorted
+    # within each length) as are blank lines and whitespace/CRLF around each word.
+    # Words get spread over one temp file per length first, so deduplicating only ever needs
+    # one length's worth of words in memory at a time.
+    clearTerminal()
+    outputPath  = crackParams.compile_wordlist
+    outputDir   = path.dirname(path.abspath(outputPath))
+    buckets     = {}
+    lines       = 0
+    try:
+        for words, _ in iterWordlistBatches(crackParams.d):
+            lines += len(words)
+            byLength = {}
+            for word in words:
+                if len(word) <= 0xFFFF:
+                    byLength.setdefault(len(word), []).append(word)
+            for length, bucketWords in byLength.items():
+                if length not in buckets:
+                    buckets[length] = tempfile.TemporaryFile(dir=outputDir)
+                buckets[length].write(b''.join(bucketWords))
+
+        tempPath    = outputPath + '.tmp'
+        total       = 0
+        table       = []
+        with open(tempPath, 'wb') as f:
+            f.write(WORDLIST_HEADER.pack(WORDLIST_MAGIC, 0, 0))
+            f.write(b'\x00' * (WORDLIST_BUCKET.size * len(buckets)))
+            for length in sorted(buckets):
+                bucket = buckets[length]
+                bucket.seek(0)
+                seen        = set()
+                firstWord   = total
+                dataOffset  = f.tell()
+                while True:
+                    chunk = bucket.read(length * WORDLIST_BATCH_SIZE)
+                    if not chunk:
+                        break
+                    unique = []
+                    for i in range(0, len(chunk), length):
+                        word = chunk[i:i + length]
+                        if word not in seen:
+                            seen.add(word)
+                            unique.append(word)
+                    f.write(b''.join(unique))
+                    total += len(unique)
+                bucket.close()
+                table.append(WORDLIST_BUCKET.pack(length, firstWord, dataOffset))
+            f.seek(0)
+            f.write(WORDLIST_HEADER.pack(WORDLIST_MAGIC, total, len(table)))
+            f.write(b''.join(table))
+            f.flush()
+            fsync(f.fileno())
+        replace(tempPath, outputPath)
+    except OSError as e:
+        print(f"Could not compile {crackParams.d} into {outputPath}: {e}")
+        sys.exit()
+    print(f"Compiled {bcolors.YELLOW}{lines:,d}{bcolors.NORMAL} words into {bcolors.YELLOW}{total:,d}{bcolors.NORMAL} unique ones in {len(table):,d} length buckets: {outputPath}")
+
+def isCompiledWordlist(wordlistPath):
+    # Compiled wordlists start with WORDLIST_MAGIC, text ones (almost certainly) don't
+    try:
+        with open(wordlistPath, 'rb') as f:
+            return f.read(len(WORDLIST_MAGIC)) == WORDLIST_MAGIC
+    except OSError:
         return False
+
+def readCompiledWordlist(wordlist):
+    # Reads the header and bucket table of an mmapped compiled wordlist.
+    # Returns (number of words, [(length, first word number, word count, file offset), ...])
+    magic, total, bucketCount = WORDLIST_HEADER.unpack_from(wordlist, 0)
+    entries = [WORDLIST_BUCKET.unpack_from(wordlist, WORDLIST_HEADER.size + i * WORDLIST_BUCKET.size) for i in range(bucketCount)]
+    buckets = []
+    for i, (length, firstWord, dataOffset) in enumerate(entries):
+        nextWord = entries[i + 1][1] if i + 1 < len(entries) else total
+        buckets.append((length, firstWord, nextWord - firstWord, dataOffset))
+    return total, buckets
+
+def iterCompiledWordlistBatches(wordlistPath, offset=0, batchSize=WORDLIST_BATCH_SIZE, lengthRange=None, shard=None, stop=None):
+    # Walks a compiled wordlist straight out of an mmap. A batch is one slice of a bucket cut
+    # into same-sized words, so there are no lines to find and nothing to strip.
+    # offset is the number of the first word to return. lengthRange skips whole buckets,
+    # and shard (i, n) only walks the i-th of n equal slices of word numbers, so n machines
+    # can split one wordlist between them without overlapping. stop is the number of the word
+    # to stop before, for walking one lease of a distributed crack.
+    # Yields (list of words as bytes, number of the word after the batch)
+    with open(wordlistPath, 'rb') as f:
+        wordlist = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    try:
+        total, buckets = readCompiledWordlist(wordlist)
+        shardStart, shardStop = 0, total if stop == None else min(stop, total)
+        if shard != None:
+            shardStart  = total * (shard[0] - 1) // shard[1]
+            shardStop   = min(shardStop, total * shard[0] // shard[1])
+        for length, firstWord, count, dataOffset in buckets:
+            if lengthRange != None and not lengthRange[0] <= length <= lengthRange[1]:
+                continue
+            bucketStart = max(firstWord, shardStart, offset)
+            bucketStop  = min(firstWord + count, shardStop)
+            for batchStart in range(bucketStart, bucketStop, batchSize):
+                batchStop   = min(bucketStop, batchStart + batchSize)
+                chunk       = wordlist[dataOffset + (batchStart - firstWord) * length:dataOffset + (batchStop - firstWord) * length]
+                yield [chunk[i:i + length] for i in range(0, len(chunk), length)], batchStop
+    finally:
+        wordlist.close()
+
+def getWordlistSize(wordlistPath):
+    # What the offsets from iterWordlistBatches run up to: bytes for a text wordlist, words
+    # for a compiled one
+    if isCompiledWordlist(wordlistPath):
+        with open(wordlistPath, 'rb') as f:
+            return WORDLIST_HEADER.unpack(f.read(WORDLIST_HEADER.size))[1]
+    return path.getsize(wordlistPath)
+
+def parseWordLength(text):
+    # argparse type for --word-length: N or MIN-MAX
+    try:
+        shortest, _, longest = text.partition('-')
+        lengthRange = (int(shortest), int(longest or shortest))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"{text} isn't a length or a MIN-MAX range")
+    if lengthRange[0] < 1 or lengthRange[0] > lengthRange[1]:
+        raise argparse.ArgumentTypeError(f"{text} isn't a valid length range")
+    return lengthRange
+
+def parseShard(text):
+    # argparse type for --shard: I/N, i.e. the I-th of N slices (counting from 1)
+    try:
+        index, _, count = text.partition('/')
+        shard = (int(index), int(count))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"{text} isn't a shard like 2/8")
+    if shard[1] < 1 or not 1 <= shard[0] <= shard[1]:
+        raise argparse.ArgumentTypeError(f"{text} isn't a valid shard, it has to be between 1/N and N/N")
+    return shard
+
+def crackDictionaryBatch(words):
+    # Hashes and compares a batch of wordlist entries along with everything the mangler
+    # rules make of them. With no rules turned on, the raw words go straight to the hasher.
+    # Otherwise the mangler pipeline streams candidates to me block by block: single mangled
+    # words pile up into a batch that gets hashed every CANDIDATE_BATCH_SIZE candidates, and
+    # (base word, suffixes) blocks get hashed right away sharing the hashed base word.
+    global testedCombinations
+    if len(manglerPipeline) == 0:
+        for position, digest in hashAndCompareBatch(words):
+            recordCrack(digest, words[position])
+        testedCombinations += len(words)
+        return
+
+    candidates = []
+    for prefix, tails in iterMangledBlocks(words):
+        if budgetSpent():
+            # Expensive rules can make millions of candidates per batch, so an attack plan
+            # stage out of budget doesn't wait for the rest of them
+            return
+        if prefix:
+            for position, digest in hashAndCompareSuffixes(prefix, tails):
+                recordCrack(digest, prefix + tails[position])
+            testedCombinations += len(tails)
+        else:
+            candidates.extend(tails)
+            if len(candidates) >= CANDIDATE_BATCH_SIZE:
+                for position, digest in hashAndCompareBatch(candidates):
+                    recordCrack(digest, candidates[position])
+                testedCombinations += len(candidates)
+                candidates = []
+    for position, digest in hashAndCompareBatch(candidates):
+        recordCrack(digest, candidates[position])
+    testedCombinations += len(candidates)
+
+# How many batches each worker can have waiting for it in a pipeline queue. Once a queue is
+# full, whoever is feeding it blocks until the next stage catches up, so memory stays flat.
+PIPELINE_QUEUE_DEPTH = 4
+
+def crackDictionaryPipeline(crackParams, offset, workers):
+    # Runs the dictionary attack as a pipeline of stages joined by bounded queues:
+    #   reader thread -> wordQueue -> mangler processes -> candidateQueue -> hasher processes
+    # and every stage reports back to me through resultQueue. Without any mangler rules the
+    # reader feeds the hashers directly and every worker is a hasher.
+    # Wordlist batches get a sequence number. A mangler cuts each one into candidate batches
+    # of about CANDIDATE_BATCH_SIZE and tells me how many it made, and hashers send back what
+    # they cracked for each one. A wordlist batch is done once all of its pieces are, and
+    # the checkpoint offset only moves past batches that are done along with everything
+    # before them, since batches finish out of order.
+    # Once the last hash is cracked I set a shared stop flag, which makes every stage bail
+    # out at its next batch.
+    global testedCombinations
+    manglers        = max(1, workers // 3) if len(manglerPipeline) > 0 else 0
+    hashers         = max(1, workers - manglers)
+    stopEvent       = multiprocessing.Event()
+    wordQueue       = multiprocessing.Queue(manglers * PIPELINE_QUEUE_DEPTH) if manglers > 0 else None
+    candidateQueue  = multiprocessing.Queue(hashers * PIPELINE_QUEUE_DEPTH)
+    resultQueue     = multiprocessing.Queue()
+    batchOrder      = collections.deque()
+    batchEnds       = {}
+    batchParts      = {}
+    readerState     = {'done': False, 'error': None}
+    dedupCounts     = [0, 0]        # Candidates the manglers' filters skipped and added
+
+    stages = [multiprocessing.Process(target=dictionaryMangler, args=(crackParams, stopEvent, wordQueue, candidateQueue, resultQueue), daemon=True) for _ in range(manglers)]
+    stages += [multiprocessing.Process(target=dictionaryHasher, args=(crackParams.hash_type, targets, stopEvent, candidateQueue, resultQueue), daemon=True) for _ in range(hashers)]
+    for stage in stages:
+        stage.start()
+    reader = threading.Thread(target=dictionaryReader, args=(crackParams, offset, stopEvent, wordQueue or candidateQueue, resultQueue, manglers == 0, batchOrder, batchEnds, readerState), daemon=True)
+    reader.start()
+
+    nextCheckpoint = time.monotonic() + crackParams.checkpoint_interval
+    try:
+        with ProgressReporter(crackParams, lambda: offset, getWordlistSize(crackParams.d)):
+            while not readerState['done'] or len(batchOrder) > 0:
+                try:
+                    message = resultQueue.get(timeout=0.1)
+                except queue.Empty:
+                    if any(stage.exitcode not in (None, 0) for stage in stages):
+                        saveCheckpoint(crackParams, 'dictionary', offset=offset)
+                        print(f"A dictionary worker process died. Run again with --resume to pick up where I left off.")
+                        sys.exit()
+                    continue
+
+                # ('mangled', seq, pieces, skipped, added) or ('hashed', seq, [(digest, candidate), ...], tested)
+                seq     = message[1]
+                parts   = batchParts.setdefault(seq, [None, 0])
+                if message[0] == 'mangled':
+                    parts[0] = message[2]
+                    dedupCounts[0] += message[3]
+                    dedupCounts[1] += message[4]
+                else:
+                    parts[1] += 1
+                    testedCombinations += message[3]
+                    for digest, testPW in message[2]:
+                        recordCrack(digest, testPW)
+
+                # If a mangled word matches, it's already been reported. Once every hash
+                # is cracked (or an attack plan stage's budget is used up), stop every
+                # stage and print results.
+                if len(targets) == 0 or budgetSpent():
+                    break
+
+                # Move the offset past every finished batch at the front of the line
+                while len(batchOrder) > 0:
+                    pieces, hashed = batchParts.get(batchOrder[0], (None, 0))
+                    if pieces != hashed:
+                        break
+                    seq     = batchOrder.popleft()
+                    offset  = batchEnds.pop(seq)
+                    del batchParts[seq]
+
+                # Every so often, save where I'm at so a crash doesn't cost days of work
+                if crackParams.checkpoint_interval > 0 and time.monotonic() >= nextCheckpoint:
+                    saveCheckpoint(crackParams, 'dictionary', offset=offset)
+                    nextCheckpoint = time.monotonic() + crackParams.checkpoint_interval
+            if readerState['error'] != None:
+                raise readerState['error']
+    except OSError:
+        print (f"Could not open/read wordlist at {crackParams.d}. Please try again.")
+        sys.exit()
+    except KeyboardInterrupt:
+        # Anything still in the pipeline gets retested on resume
+        saveCheckpoint(crackParams, 'dictionary', offset=offset)
+        print(f"\nStopped. Run again with --resume to pick up where I left off.")
+        sys.exit()
+    finally:
+        # Whatever is still sitting in the queues is thrown away, otherwise exiting would
+        # wait forever on the queues' feeder threads to hand it to stages that are gone
+        stopEvent.set()
+        for pipelineQueue in (wordQueue, candidateQueue, resultQueue):
+            if pipelineQueue != None:
+                pipelineQueue.cancel_join_thread()
+        for stage in stages:
+            stage.join(timeout=1)
+            if stage.is_alive():
+                stage.terminate()
+
+    # Either everything is cracked or I've exhausted our wordlist
+    removeCheckpoint(crackParams)
+    reportCandidateFilter(*dedupCounts)
+    if len(crackedHashes) > 0:
+        return crackedHashes
     return False
 
+def dictionaryReader(crackParams, offset, stopEvent, outQueue, resultQueue, unmangled, batchOrder, batchEnds, readerState):
+    # Pipeline stage, runs as a thread in the main process since it mostly waits on the disk.
+    # Streams wordlist batches into the next stage's queue, waiting whenever it's full.
+    # With no manglers in the pipeline, each batch goes straight to the hashers as a single
+    # piece and I report that piece count myself.
+    try:
+        for seq, (words, batchEndOffset) in enumerate(iterWordlistBatches(crackParams.d, offset, lengthRange=crackParams.word_length, shard=crackParams.shard)):
+            batchEnds[seq] = batchEndOffset
+            batchOrder.append(seq)
+            message = (seq, [(b'', words)]) if unmangled else (seq, words)
+            if not putPipelineQueue(outQueue, message, stopEvent):
+                return
+            if unmangled:
+                resultQueue.put(('mangled', seq, 1, 0, 0))
+    except OSError as e:
+        readerState['error'] = e
+    finally:
+        readerState['done'] = True
+
+def dictionaryMangler(crackParams, stopEvent, wordQueue, candidateQueue, resultQueue):
+    # Pipeline stage, runs in its own process. Expands wordlist batches through the mangler
+    # pipeline and passes them on in pieces of about CANDIDATE_BATCH_SIZE candidates, each
+    # piece being a list of the same (prefix, tails) blocks iterMangledBlocks makes.
+    # With --dedup-mb every mangler has a filter of its own, so a repeat only gets skipped
+    # if the same mangler made it before.
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    buildManglerPipeline(crackParams)
+    while True:
+        message = getPipelineQueue(wordQueue, stopEvent)
+        if message == None:
+            return
+        seq, words  = message
+        pieces      = 0
+        blocks      = []
+        size        = 0
+        for prefix, tails in iterMangledBlocks(words):
+            blocks.append((prefix, tails))
+            size += len(tails)
+            if size >= CANDIDATE_BATCH_SIZE:
+                if not putPipelineQueue(candidateQueue, (seq, blocks), stopEvent):
+                    return
+                pieces  += 1
+                blocks  = []
+                size    = 0
+        if blocks:
+            if not putPipelineQueue(candidateQueue, (seq, blocks), stopEvent):
+                return
+            pieces += 1
+        if candidateFilter != None:
+            resultQueue.put(('mangled', seq, pieces, candidateFilter.skipped, candidateFilter.added))
+            candidateFilter.skipped = candidateFilter.added = 0
+        else:
+            resultQueue.put(('mangled', seq, pieces, 0, 0))
+
+def dictionaryHasher(hashType, targetDigests, stopEvent, candidateQueue, resultQueue):
+    # Pipeline stage, runs in its own process. Hashes and compares pieces of candidates and
+    # sends back whatever it cracked along with how many candidates it tested.
+    global targets, hashBackend
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    targets     = set(targetDigests)
+    hashBackend = HASH_BACKENDS[hashType]
+    while True:
+        message = getPipelineQueue(candidateQueue, stopEvent)
+        if message == None:
+            return
+        seq, blocks = message
+        cracked     = []
+        tested      = 0
+        for prefix, tails in blocks:
+            if prefix:
+                hits = hashAndCompareSuffixes(prefix, tails)
+            else:
+                hits = hashAndCompareBatch(tails)
+            for position, digest in hits:
+                targets.discard(digest)
+                cracked.append((digest, prefix + tails[position]))
+            tested += len(tails)
+        resultQueue.put(('hashed', seq, cracked, tested))
+
+def putPipelineQueue(pipelineQueue, message, stopEvent):
+    # Waits for room in a bounded pipeline queue, giving up if the stop flag gets set.
+    # Returns True once the message is queued
+    while not stopEvent.is_set():
+        try:
+            pipelineQueue.put(message, timeout=0.1)
+            return True
+        except queue.Full:
+            pass
+    return False
+
+def getPipelineQueue(pipelineQueue, stopEvent):
+    # Waits for the next message in a pipeline queue, giving up if the stop flag gets set.
+    # Returns the message, or None once it's time to stop
+    while not stopEvent.is_set():
+        try:
+            return pipelineQueue.get(timeout=0.1)
+        except queue.Empty:
+            pass
+    return None
+
 def unpackMangleRules(mRules):
     # Sets various mangling modes to True based on user input from command line
     # Returns a Python dictionary of rules with each rules set to True or False
@@ -566,130 +1719,167 @@ def unpackMangleRules(mRules):
                 manglerRules['years']   = True
     return manglerRules
 
-def getMangledPermutations(testpw):
-    # Iterate through the all the included mangling functions and build a set of mangled versions
-    # of the test word to hash and compare. Each mangling routine returns a list of
-    # permutations based on the particular rule. I compile all those permutations into one
-    # set of mangled versions, including the raw word, and return them to the main dictionary
-    # cracking function to hash and compare. I use a Python set so that any duplicates created
-    # by multiple rules are ignored to be more efficient.
-
-    global pw, mangledPWs, manglerRules
-    mangledPWs = set()
-    mangledPWs.add(testpw)
+def compileManglerRules():
+    # Turns the manglerRules flags into the list of rule generators to run on every word.
+    # This happens once at startup so the per-word work is just walking a short list
+    # instead of checking every rule flag for every word in the wordlist.
+    global manglerPipeline
+    manglerPipeline = []
     for key in manglerRules.keys():
-        # Iterate thru all rules and execute the ones flagged as True
         if manglerRules[key] == True:
-            if  key  == 'cap_ends':
-                permutations = mangle_capEnds(testPW)
-                for i in range(len(permutations)):
-                    mangledPWs.add(permutations[i])
-            elif key == 'capall':
-                permutations = mangle_capAll(testPW)
-                for i in range(len(permutations)):
-                    mangledPWs.add(permutations[i])
-            elif key == 'duplicate':
-                if len(testPW) < 6:
-                    permutations = mangle_duplicate(testPW)
-                    for i in range(len(permutations)):
-                        mangledPWs.add(permutations[i])
-            elif key == 'cap_dupe':
-                if len(testPW) < 6:
-                    mangledPWs.add(mangle_cap_dupe(testPW))
-            elif key == 'cap_rev':
-                permutations = mangle_cap_rev(testPW)
-                for i in range(len(permutations)):
-                    mangledPWs.add(permutations[i])
-            elif key == 'lowerall':
-                mangledPWs.add(mangle_lowerAll(testPW))
-            elif key == 'numbers':
-                permutations = mangle_numbers(testPW)
-                for i in range(len(permutations)):
-                    mangledPWs.add(permutations[i])
-            elif key == 'plural':
-                mangledPWs.add(mangle_puralize(testPW))
-            elif key == 'reverse':
-                mangledPWs.add(mangle_reverse(testPW))
-            elif key == 'split':
-                if len(testPW) > 5:
-                    permutations = mangle_split(testPW)
-                    for i in range(len(permutations)):
-                        mangledPWs.add(permutations[i])
-            elif key == 'tense':
-                if testPW.isalpha() and len(testPW) > 3:
-                    permutations = mangle_tense(testPW)
-                    for i in range(len(permutations)):
-                        mangledPWs.add(permutations[i])
-            elif key == 'trunc_app':
-                if len(testPW) > 4:
-                    permutations = mangle_trunc_append(testPW)
-                    for i in range(len(permutations)):
-                        mangledPWs.add(permutations[i])
-            elif key == 'years':
-                permutations = mangle_years(testPW)
-                for i in range(len(permutations)):
-                    mangledPWs.add(permutations[i])
-    return mangledPWs
+            if key == 'years' and manglerRules['numbers'] == True:
+                manglerPipeline.append(generate_fullYears)
+            else:
+                manglerPipeline.append(MANGLER_GENERATORS[key])
+    return manglerPipeline
+
+def iterMangledBlocks(words):
+    # Runs every word through the compiled mangler pipeline and lazily yields (prefix, tails)
+    # blocks where each candidate is prefix + tail. Rules that tack a long list of endings
+    # onto one base word (numbers, years, truncate) come out as their own block with the
+    # base word as the prefix so it only gets hashed once, and nothing is held onto after
+    # it has been yielded.
+    # Everything else is collected per word (starting with the raw word itself, unless
+    # --mangled-only says it's been tested already) and comes out as one block with an empty
+    # prefix. That per-word set is how I skip duplicate words generated from the various
+    # rules, and it never grows past a few dozen entries.
+    # With --dedup-mb, candidateFilter also drops anything already generated for an earlier
+    # word: whole (prefix, tails) blocks at once, and the per-word lists one by one.
+    pipeline    = manglerPipeline
+    dedup       = candidateFilter
+    for testPW in words:
+        seen        = {testPW}
+        mangledPWs  = [] if mangledOnly else [testPW]
+        for rule in pipeline:
+            for prefix, tails in rule(testPW):
+                if prefix:
+                    if dedup == None or not dedup.seenBlock(prefix, tails):
+                        yield prefix, tails
+                    continue
+                for mangledPW in tails:
+                    if mangledPW not in seen:
+                        seen.add(mangledPW)
+                        mangledPWs.append(mangledPW)
+        if dedup != None:
+            mangledPWs = dedup.filterCandidates(mangledPWs)
+        yield b'', mangledPWs
+
+class CandidateFilter:
+    # Bloom filter of every candidate generated so far in the run, capped at --dedup-mb
+    # megabytes however long the run goes. Rules regenerate the same candidates for lots of
+    # words (every word starting with 'pass' makes the same Pass00 through Pass9999! for
+    # -m T), and this lets me skip hashing them again.
+    # Blocks with a prefix go in as one entry keyed on the prefix and the first, last and
+    # number of tails, so a whole block of repeats costs one lookup. Those come from affix
+    # tables and mask keyspaces, where that's enough to tell blocks apart. The per-word lists
+    # go in one candidate at a time, which costs about as much as an MD5 per candidate, so
+    # it pays off on slower hashes and on rules that repeat a lot.
+    # Like any Bloom filter it can mistake a new candidate for a repeat (and skip it) once it
+    # fills up, so the odds of that are in the report at the end.
+    HASHES = 3
+
+    def __init__(self, megabytes):
+        self.size       = megabytes << 23      # Bits
+        self.bits       = None                 # Allocated on first use, see add()
+        self.added      = 0
+        self.skipped    = 0
+
+    def add(self, key):
+        # Sets key's bits. Returns True if they were all set already, i.e. I've (almost
+        # certainly) seen it before
+        if self.bits == None:
+            self.bits = bytearray(self.size >> 3)
+        bits    = self.bits
+        h       = hash(key)
+        step    = (h >> 29) | 1
+        seen    = True
+        for _ in range(self.HASHES):
+            i       = h % self.size
+            mask    = 1 << (i & 7)
+            if not bits[i >> 3] & mask:
+                bits[i >> 3] |= mask
+                seen = False
+            h += step
+        if not seen:
+            self.added += 1
+        return seen
+
+    def seenBlock(self, prefix, tails):
+        # Returns True (and counts the block as skipped) if this exact block came up before
+        if len(tails) == 0:
+            return False
+        if self.add(b'\x00'.join((prefix, tails[0], tails[-1], str(len(tails)).encode('ascii')))):
+            self.skipped += len(tails)
+            return True
+        return False
+
+    def filterCandidates(self, candidates):
+        # Returns the candidates that haven't come up before
+        add     = self.add
+        fresh   = [candidate for candidate in candidates if not add(candidate)]
+        self.skipped += len(candidates) - len(fresh)
+        return fresh
+
+    def falsePositiveRate(self, added=None):
+        # Odds that a brand new candidate gets taken for a repeat, with this many entries in
+        # the filter (how many I added myself if not given)
+        added = self.added if added == None else added
+        return (1 - math.exp(-self.HASHES * added / self.size)) ** self.HASHES
+
+def reportCandidateFilter(skipped=None, added=None):
+    # Tells the user how much hashing --dedup-mb saved. The counts come from the mangler
+    # processes in a pipelined run, otherwise from candidateFilter itself.
+    if candidateFilter == None:
+        return
+    skipped = candidateFilter.skipped if skipped == None else skipped
+    print(f"Deduplication skipped {bcolors.YELLOW}{skipped:,d}{bcolors.NORMAL} repeat candidates "
+          f"({candidateFilter.falsePositiveRate(added):.4%} chance a new one was mistaken for a repeat)")
 
 def mangle_capEnds(testPW):
-    # Convert testPW into a mutable list so I can upper case only the first and last letters, then convert it back to a string
-    # and add it to our list of permutations.
+    # Upper case only the first and last letters of testPW and add each version to our list
+    # of permutations. Words come straight from the wordlist as bytes, so I slice instead of
+    # indexing (indexing bytes hands back an int, not a character).
     permutations = []
 
     # Upper first character
-    mangledPass = list(testPW)
-    mangledPass[0] = mangledPass[0].upper()
-    permutations.append(''.join(mangledPass))
+    permutations.append(testPW[:1].upper() + testPW[1:])
 
     # Upper last character
-    mangledPass = list(testPW)
-    mangledPass[len(testPW)-1] = mangledPass[len(testPW)-1].upper()
-    permutations.append(''.join(mangledPass))
+    permutations.append(testPW[:-1] + testPW[-1:].upper())
     return permutations
 
 def mangle_capAll(testPW):
-    # Convert testPW into a mutable list so I can upper case each letter individually, then convert it back to a string
-    # and add it to our list of permutations.
+    # Upper case each letter individually and add each version to our list of permutations.
+    # Every letter before the one being capitalized gets lowercased along the way.
     # # Password, pAssword, paSsword, PasSword, passWord, ...
-    global mangledPWs
     permutations = []
-    testPW = list(testPW)
 
     # Upper each character individually
     for i in range(len(testPW)):
-        testPW[i] = testPW[i].upper()
-        mangledPass = ''.join(testPW)
+        mangledPass = testPW[:i].lower() + testPW[i:i+1].upper() + testPW[i+1:]
         permutations.append(mangledPass)
-        testPW[i] = testPW[i].lower()
 
     # Add a full ALLCAPS version
-    testPW = ''.join(testPW)
     permutations.append(testPW.upper())
     return permutations
 
 def mangle_cap_dupe(testPW):
-    # Convert testPW into a mutable list so I can upper case only the first letter, then convert it back to a string.
-    # Then I repeat that final capped word. This function is only called on words <= 5 characters in length.
-    testPW = list(testPW)
-    testPW[0] = testPW[0].upper()
-    cappedPass = ''.join(testPW)
+    # Upper case only the first letter, then I repeat that final capped word.
+    # This function is only called on words <= 5 characters in length.
+    cappedPass = testPW[:1].upper() + testPW[1:]
     return cappedPass + cappedPass
 
 def mangle_cap_rev(testPW):
-    # Convert testPW into a mutable list so I can upper case only the first letter, then convert it back to a string.
-    # Then I reverse that final capped word.
+    # Upper case only the first letter, then I reverse that final capped word.
     permutations = []
-    testPW = list(testPW)
 
     # Upper first letter
-    testPW[0] = testPW[0].upper()
-    cappedPass = ''.join(testPW)
+    cappedPass = testPW[:1].upper() + testPW[1:]
     # Reverse it
     permutations.append(cappedPass [::-1])
 
     #Upper last letter
-    testPW[len(testPW) - 1] = testPW[len(testPW) - 1].upper()
-    cappedPass = ''.join(testPW)
+    cappedPass = cappedPass[:-1] + cappedPass[-1:].upper()
     # Reverse it
     permutations.append(cappedPass [::-1])
     return permutations
@@ -710,23 +1900,13 @@ def mangle_lowerAll(testPW):
 def mangle_numbers(testPW):
     # Adds 1- and 2-digit number combinations to front and end of each test word
     # 0password, password1, 23password, password45, et
-    permutations = []
-    # Build an ascii string of numbers
-    nums = string.digits
-    # Iterate thru all single numbers and prepend/append them
-    for num in nums:
-        permutations.append(testPW + num)
-        permutations.append(num + testPW)
-    # Iterate thru nums and build 2-digit combinations and append/prepend them
-    for i in range(len(nums)):
-        for j in range(len(nums)):
-            permutations.append(testPW + nums[i] + nums[j])
-            permutations.append(nums[i] + nums[j] + testPW)
-    return permutations
+    # Returns (prefixes, word, suffixes) products for iterAffixProduct, both sharing the
+    # number table instead of building it again for every word.
+    return [(NUMBER_AFFIXES, testPW, NO_AFFIX), (NO_AFFIX, testPW, NUMBER_AFFIXES)]
 
 def mangle_puralize(testPW):
     # Add 's' to word to make it plural
-    return testPW + 's'
+    return testPW + b's'
 
 def mangle_reverse(testPW):
     # Return the word reversed.
@@ -747,78 +1927,2068 @@ def mangle_tense(testPW):
     # Treat the word like a verb and modify the various tenses: walks, walked, walking
     permutations = []
     # Add an 'es' to words that end in certain character combinations
-    if testPW[len(testPW)-1] == 'o' or testPW[len(testPW)-1] == 'x' or testPW[len(testPW)-1] == 'z' or (testPW[len(testPW)-2] + testPW[len(testPW)-1]) == 'sh' or (testPW[len(testPW)-2] + testPW[len(testPW)-1]) == 'ch' or (testPW[len(testPW)-2] + testPW[len(testPW)-1]) == 'ss' or (testPW[len(testPW)-3] + testPW[len(testPW)-2] + testPW[len(testPW)-1]) == 'tch':
-        permutations.append(testPW + 'es')
+    if testPW.endswith((b'o', b'x', b'z', b'sh', b'ch', b'ss', b'tch')):
+        permutations.append(testPW + b'es')
     # Pluralize words ending in 'y' with 'ies'
-    elif testPW[len(testPW)-1] == 'y':
-        mangledPW = list(testPW)
-        del mangledPW[-1]
-        mangledPW = ''.join(mangledPW)
-        permutations.append(mangledPW + 'ies')
-    elif testPW[len(testPW)-1] != 's':
-        permutations.append(testPW + 's')
+    elif testPW.endswith(b'y'):
+        permutations.append(testPW[:-1] + b'ies')
+    elif testPW.endswith(b's') == False:
+        permutations.append(testPW + b's')
 
     # Words ending in 'e' need to have the 'e' removed before adding 'ed' and 'ing'
     #   e.g. 'pace' would need to be 'pacing' and 'paced', not 'paceing' and 'paceed'
-    if testPW[len(testPW)-1] == 'e':
-        mangledPW = list(testPW)
-        del mangledPW[-1]
-        mangledPW = ''.join(mangledPW)
-        permutations.append(mangledPW + 'ed')
-        permutations.append(mangledPW + 'ing')
-    elif testPW[len(testPW)-1] == 'y':
-        permutations.append(mangledPW + 'ing')
-        mangledPW = list(testPW)
-        del mangledPW[-1]
-        mangledPW = ''.join(mangledPW)
-        permutations.append(mangledPW + 'ied')
+    if testPW.endswith(b'e'):
+        permutations.append(testPW[:-1] + b'ed')
+        permutations.append(testPW[:-1] + b'ing')
+    # Words ending in 'y' keep it for 'ing' but swap it for 'ied': studying, studied
+    elif testPW.endswith(b'y'):
+        permutations.append(testPW + b'ing')
+        permutations.append(testPW[:-1] + b'ied')
 
     else:
-        permutations.append(testPW + 'ed')
-        permutations.append(testPW + 'ing')
+        permutations.append(testPW + b'ed')
+        permutations.append(testPW + b'ing')
     return permutations
 
 def mangle_trunc_append(testPW):
     # Truncate word to 4 characters, capitalize it, append 2- and 4-digit
     # combinations followed by an !
-    permutations = []
-    fourCharPass = testPW[0].upper() + testPW[1] + testPW[2] + testPW[3]
-    nums = string.digits
-    for i in range(len(nums)):
-        for j in range(len(nums)):
-            # Prepend/append 2-digits
-            permutations.append(fourCharPass + nums[i] + nums[j])
-            permutations.append(fourCharPass + nums[i] + nums[j] + '!')
-            for k in range(len(nums)):
-                for l in range(len(nums)):
-                    # Prepend/append 4-digits
-                    permutations.append(fourCharPass + nums[i] + nums[j] + nums[k] + nums[l])
-                    permutations.append(fourCharPass + nums[i] + nums[j] + nums[k] + nums[l] + '!')
-    return permutations
+    # Everything here is an ending on the same 4-character base, so it's one product of
+    # the base word and the endings in the truncate table (TRUNC_APPEND_AFFIXES).
+    fourCharPass = testPW[:1].upper() + testPW[1:4]
+    return [(NO_AFFIX, fourCharPass, TRUNC_APPEND_AFFIXES)]
+
+def mangle_years(testPW, yearAffixes=None):
+    # Prepends/appends both two- and four-digit years from 1970 through 2020 [1970-2020, 70-20]
+    # to the word from the wordlist. Returns (prefixes, word, suffixes) products for
+    # iterAffixProduct, both sharing the year table (YEAR_AFFIXES unless I'm given another).
+    yearAffixes = YEAR_AFFIXES if yearAffixes == None else yearAffixes
+    return [(yearAffixes, testPW, NO_AFFIX), (NO_AFFIX, testPW, yearAffixes)]
+
+# Affix tables for the number, year and truncate rules. They're built once when the script
+# starts and every word shares them, so those rules don't build anything per word.
+NO_AFFIX            = (b'',)
+DIGIT_AFFIXES       = tuple(digit.encode('ascii') for digit in string.digits)
+NUMBER_AFFIXES      = DIGIT_AFFIXES + tuple(i + j for i in DIGIT_AFFIXES for j in DIGIT_AFFIXES)
+FULL_YEAR_AFFIXES   = tuple(str(y).encode('ascii') for y in range(1970, 2021))
+YEAR_AFFIXES        = FULL_YEAR_AFFIXES + \
+                      tuple(f'{y:02d}'.encode('ascii') for y in itertools.chain(range(70, 100), range(0, 21)))
+
+def buildTruncAppendAffixes():
+    # Every 2-digit ending, then the 4-digit endings starting with those 2 digits, each one
+    # with and without a trailing '!': 00, 00!, 0000, 0000!, 0001, 0001!, ... 99, 99!, ... 9999!
+    affixes = []
+    for i in DIGIT_AFFIXES:
+        for j in DIGIT_AFFIXES:
+            affixes.append(i + j)
+            affixes.append(i + j + b'!')
+            for k in DIGIT_AFFIXES:
+                for l in DIGIT_AFFIXES:
+                    affixes.append(i + j + k + l)
+                    affixes.append(i + j + k + l + b'!')
+    return tuple(affixes)
+
+TRUNC_APPEND_AFFIXES = buildTruncAppendAffixes()
+
+def iterAffixProduct(prefixes, word, suffixes, batchSize=CANDIDATE_BATCH_SIZE):
+    # Streams every prefix + word + suffix combination as (prefix, tails) blocks of at most
+    # batchSize candidates, the same blocks the rule generators make.
+    # With a real list of suffixes each prefix + word is the block's prefix, so it gets
+    # hashed once, and the tails are slices of the shared table (the whole table itself
+    # when it fits in one batch, no copy at all). With a single suffix the prefixes are what
+    # changes, so the candidates get glued together batchSize at a time.
+    if len(suffixes) > 1:
+        for prefix in prefixes:
+            head = prefix + word
+            for start in range(0, len(suffixes), batchSize):
+                yield head, suffixes[start:start + batchSize]
+    else:
+        tail = word + suffixes[0]
+        for start in range(0, len(prefixes), batchSize):
+            yield b'', [prefix + tail for prefix in prefixes[start:start + batchSize]]
+
+# Rule generators
+#   Each enabled rule is one of these. They take a word and yield (prefix, tails) blocks,
+#   where an empty prefix means the tails are complete candidates on their own.
+
+def generate_capEnds(testPW):
+    yield b'', mangle_capEnds(testPW)
+
+def generate_capAll(testPW):
+    yield b'', mangle_capAll(testPW)
+
+def generate_duplicate(testPW):
+    if len(testPW) < 6:
+        yield b'', mangle_duplicate(testPW)
+
+def generate_cap_dupe(testPW):
+    if len(testPW) < 6:
+        yield b'', [mangle_cap_dupe(testPW)]
+
+def generate_cap_rev(testPW):
+    yield b'', mangle_cap_rev(testPW)
+
+def generate_lowerAll(testPW):
+    yield b'', [mangle_lowerAll(testPW)]
+
+def generate_numbers(testPW):
+    for product in mangle_numbers(testPW):
+        yield from iterAffixProduct(*product)
+
+def generate_puralize(testPW):
+    yield b'', [mangle_puralize(testPW)]
+
+def generate_reverse(testPW):
+    yield b'', [mangle_reverse(testPW)]
+
+def generate_split(testPW):
+    if len(testPW) > 5:
+        yield b'', mangle_split(testPW)
+
+def generate_tense(testPW):
+    if testPW.isalpha() and len(testPW) > 3:
+        yield b'', mangle_tense(testPW)
+
+def generate_trunc_append(testPW):
+    if len(testPW) > 4:
+        for product in mangle_trunc_append(testPW):
+            yield from iterAffixProduct(*product)
+
+def generate_years(testPW):
+    for product in mangle_years(testPW):
+        yield from iterAffixProduct(*product)
 
-def mangle_years(testPW):
-    # Create a temporary list of both two- and four-digit years from 1970 through 2021 [1970-2021, 70-21]
-    # and then prepend/append them to the word from the wordlist and return all possible permutations.
-
-    # Build all year values
-    years = []
-    for y in range(1970, 2021):
-        years.append(str(y))
-    for y in range(70,100):
-        years.append(str(y))
-    for y in range(0,21):
-        if y < 10:
-            y = '0' + str(y)
-            years.append(y)
+def generate_fullYears(testPW):
+    # The years rule when the numbers rule is on too. Every 2-digit year is already one of
+    # its numbers, and the appended ones come out as blocks the per-word set never sees,
+    # so they'd all get hashed twice.
+    for product in mangle_years(testPW, FULL_YEAR_AFFIXES):
+        yield from iterAffixProduct(*product)
+
+MANGLER_GENERATORS = {
+    'cap_ends'  : generate_capEnds,
+    'capall'    : generate_capAll,
+    'duplicate' : generate_duplicate,
+    'cap_dupe'  : generate_cap_dupe,
+    'cap_rev'   : generate_cap_rev,
+    'lowerall'  : generate_lowerAll,
+    'numbers'   : generate_numbers,
+    'plural'    : generate_puralize,
+    'reverse'   : generate_reverse,
+    'split'     : generate_split,
+    'tense'     : generate_tense,
+    'trunc_app' : generate_trunc_append,
+    'years'     : generate_years
+    }
+
+# - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+# Rules file functions
+# - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+
+# Every rule function I understand, mapped to the arguments it takes ('N' = position,
+# 'X' = character) and a template that wraps the Python expression for the word so far.
+# Functions that need to look at the word more than once go through one of the rule_*
+# helpers below so the expression for the word never gets evaluated twice.
+RULE_FUNCTIONS = {
+    ':' : ('',   lambda w: w),
+    'l' : ('',   lambda w: f'{w}.lower()'),
+    'u' : ('',   lambda w: f'{w}.upper()'),
+    'c' : ('',   lambda w: f'{w}.capitalize()'),
+    'C' : ('',   lambda w: f'rule_invertCapitalize({w})'),
+    't' : ('',   lambda w: f'{w}.swapcase()'),
+    'T' : ('N',  lambda w, n: f'rule_toggleAt({w}, {n})'),
+    'r' : ('',   lambda w: f'{w}[::-1]'),
+    'd' : ('',   lambda w: f'({w} * 2)'),
+    'p' : ('N',  lambda w, n: f'({w} * {n + 1})'),
+    'f' : ('',   lambda w: f'rule_reflect({w})'),
+    '{' : ('',   lambda w: f'rule_rotateLeft({w})'),
+    '}' : ('',   lambda w: f'rule_rotateRight({w})'),
+    '$' : ('X',  lambda w, x: f'({w} + {x!r})'),
+    '^' : ('X',  lambda w, x: f'({x!r} + {w})'),
+    '[' : ('',   lambda w: f'{w}[1:]'),
+    ']' : ('',   lambda w: f'{w}[:-1]'),
+    'D' : ('N',  lambda w, n: f'rule_deleteAt({w}, {n})'),
+    'x' : ('NN', lambda w, n, m: f'{w}[{n}:{n + m}]'),
+    'O' : ('NN', lambda w, n, m: f'rule_omit({w}, {n}, {m})'),
+    'i' : ('NX', lambda w, n, x: f'rule_insert({w}, {n}, {x!r})'),
+    'o' : ('NX', lambda w, n, x: f'rule_overwrite({w}, {n}, {x!r})'),
+    "'" : ('N',  lambda w, n: f'{w}[:{n}]'),
+    's' : ('XX', lambda w, x, y: f'{w}.replace({x!r}, {y!r})'),
+    '@' : ('X',  lambda w, x: f"{w}.replace({x!r}, b'')"),
+    'z' : ('N',  lambda w, n: f'rule_dupeFirst({w}, {n})'),
+    'Z' : ('N',  lambda w, n: f'rule_dupeLast({w}, {n})'),
+    'q' : ('',   lambda w: f'rule_dupeEach({w})'),
+    'k' : ('',   lambda w: f'rule_swap({w}, 0, 1)'),
+    'K' : ('',   lambda w: f'rule_swap({w}, -2, -1)'),
+    '*' : ('NN', lambda w, n, m: f'rule_swap({w}, {n}, {m})'),
+    'E' : ('',   lambda w: f'rule_title({w})'),
+    }
+RULE_POSITIONS = '0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ'
+
+def parseRule(line):
+    # Splits one line of a rules file into a list of (function, [arguments]) steps.
+    # Spaces between functions are ignored, but a space given as a character argument
+    # (e.g. '$ ' to append a space) is kept. Raises ValueError on anything I don't know.
+    steps = []
+    i = 0
+    while i < len(line):
+        function = chr(line[i])
+        i += 1
+        if function == ' ' or function == '\t':
+            continue
+        if function not in RULE_FUNCTIONS:
+            raise ValueError(f"unknown rule function '{function}'")
+        argumentSpec = RULE_FUNCTIONS[function][0]
+        arguments = []
+        for spec in argumentSpec:
+            if i >= len(line):
+                raise ValueError(f"rule function '{function}' is missing an argument")
+            if spec == 'N':
+                position = RULE_POSITIONS.find(chr(line[i]))
+                if position < 0:
+                    raise ValueError(f"'{chr(line[i])}' isn't a valid position for rule function '{function}'")
+                arguments.append(position)
+            else:
+                arguments.append(line[i:i+1])
+            i += 1
+        steps.append((function, arguments))
+    return steps
+
+def compileRuleFile(rulesPath):
+    # Reads a rules file and compiles every rule in it into a single Python function, so
+    # running thousands of rules on a word is one function call that evaluates a long list
+    # of plain bytes expressions rather than thousands of calls into a rule interpreter.
+    # Rules that end by appending characters are grouped by everything that comes before
+    # the appends, so e.g. every 'c $1 $2'-style rule shares one hashed 'Password' prefix.
+    # Returns a rule generator that plugs into the mangler pipeline like the -m rules.
+    try:
+        with open(rulesPath, 'rb') as rulesFile:
+            lines = rulesFile.read().splitlines()
+    except OSError:
+        print (f"Could not open/read rules file at {rulesPath}. Please try again.")
+        sys.exit()
+
+    plainRules      = []    # Expressions for rules that don't end in appends
+    suffixGroups    = {}    # Expression for the rule body -> list of appended suffixes
+    for lineNumber, line in enumerate(lines, start=1):
+        if line.strip() == b'' or line.startswith(b'#'):
+            continue
+        try:
+            steps = parseRule(line)
+        except ValueError as e:
+            print(f"Problem with line {lineNumber} of {rulesPath}: {e}")
+            sys.exit()
+
+        # Peel the trailing appends off the end of the rule
+        suffix = b''
+        while steps and steps[-1][0] == '$':
+            suffix = steps.pop()[1][0] + suffix
+        expression = 'w'
+        for function, arguments in steps:
+            expression = RULE_FUNCTIONS[function][1](expression, *arguments)
+        if suffix:
+            suffixGroups.setdefault(expression, []).append(suffix)
         else:
-            years.append(str(y))
-    permutations = []
-    # Prepend / append 2- and 4-digit years
-    for y in years:
-        permutations.append(y + testPW)
-        permutations.append(testPW + y)
+            plainRules.append(expression)
 
-    return permutations
+    blocks = [f"(b'', [{', '.join(plainRules)}])"]
+    for expression, suffixes in suffixGroups.items():
+        blocks.append(f'({expression}, {tuple(dict.fromkeys(suffixes))!r})')
+    source = 'def generate_ruleFile(w):\n    return (\n        ' + ',\n        '.join(blocks) + ',\n    )\n'
+    namespace = dict(globals())
+    exec(compile(source, rulesPath, 'exec'), namespace)
+    return namespace['generate_ruleFile']
+
+def rule_invertCapitalize(word):
+    # Lowercase the first letter, uppercase the rest
+    return word[:1].lower() + word[1:].upper()
+
+def rule_toggleAt(word, n):
+    # Toggle the case of the character at position n
+    return word[:n] + word[n:n+1].swapcase() + word[n+1:]
+
+def rule_reflect(word):
+    # password -> passworddrowssap
+    return word + word[::-1]
+
+def rule_rotateLeft(word):
+    # password -> asswordp
+    return word[1:] + word[:1]
+
+def rule_rotateRight(word):
+    # password -> dpasswor
+    return word[-1:] + word[:-1]
+
+def rule_deleteAt(word, n):
+    # Remove the character at position n
+    return word[:n] + word[n+1:]
+
+def rule_omit(word, n, m):
+    # Remove m characters starting at position n
+    return word[:n] + word[n+m:]
+
+def rule_insert(word, n, character):
+    # Insert a character at position n, as long as the word is at least that long
+    if n > len(word):
+        return word
+    return word[:n] + character + word[n:]
+
+def rule_overwrite(word, n, character):
+    # Replace the character at position n, as long as there is one
+    if n >= len(word):
+        return word
+    return word[:n] + character + word[n+1:]
+
+def rule_dupeFirst(word, n):
+    # Repeat the first character n more times: password -> ppppassword
+    return word[:1] * n + word
+
+def rule_dupeLast(word, n):
+    # Repeat the last character n more times: password -> passworddd
+    return word + word[-1:] * n
+
+def rule_dupeEach(word):
+    # Double up every character: abc -> aabbcc
+    return bytes(character for character in word for _ in (0, 1))
+
+def rule_swap(word, n, m):
+    # Swap the characters at positions n and m, as long as both exist
+    if max(n, m) >= len(word) or min(n, m) < -len(word):
+        return word
+    characters = bytearray(word)
+    characters[n], characters[m] = characters[m], characters[n]
+    return bytes(characters)
+
+def rule_title(word):
+    # Lowercase everything, then uppercase the first letter and every letter after a space
+    return b' '.join(part.capitalize() for part in word.lower().split(b' '))
+
+# - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+# Digest index functions
+# - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+
+INDEX_MAGIC         = b'ETTUIDX2'
+INDEX_HEADER        = struct.Struct('<8sQ8s')   # Magic, number of records, hash type
+INDEX_OFFSET        = struct.Struct('<Q')       # Offset of the plaintext, after each record's digest
+INDEX_PLAINTEXT     = struct.Struct('<H')       # Length stored in front of each plaintext
+INDEX_RUN_SIZE      = 1 << 20                   # Records sorted in memory before spilling to disk
+
+def buildDigestIndex(crackParams):
+    # Runs the same candidate stream crack_Dictionary would (wordlist x -m rules x rules file
+    # x hybrid masks) exactly once and saves every digest so later runs can look hashes up
+    # instead of hashing it all over again.
+    # The index is a header, then fixed-width (digest, plaintext offset) records sorted by
+    # digest, then the plaintexts, each with its length in front. Records are as wide as the
+    # hash type's digest plus 8 bytes, and the header says which hash type it is. The candidate stream can
+    # be way bigger than memory, so records get sorted in runs of INDEX_RUN_SIZE, spilled
+    # to temp files and merged at the end. Plaintexts go straight to a temp file as they're
+    # generated, and only the ones whose record survives the merge make it into the index.
+    global testedCombinations
+    clearTerminal()
+    buildManglerPipeline(crackParams)
+    indexPath       = crackParams.build_index
+    indexDir        = path.dirname(path.abspath(indexPath))
+    hashWord        = hashBackend.hash
+    runs            = []
+    records         = []
+    plaintextOffset = 0
+    try:
+        plaintexts = tempfile.TemporaryFile(dir=indexDir)
+        offset = 0
+        with ProgressReporter(crackParams, lambda: offset, getWordlistSize(crackParams.d)):
+            for words, offset in iterWordlistBatches(crackParams.d, lengthRange=crackParams.word_length, shard=crackParams.shard):
+                if len(manglerPipeline) == 0:
+                    blocks = [(b'', words)]
+                else:
+                    blocks = iterMangledBlocks(words)
+                for prefix, tails in blocks:
+                    pieces = []
+                    for tail in tails:
+                        testPW = prefix + tail
+                        if len(testPW) > 0xFFFF:
+                            continue
+                        records.append(hashWord(testPW) + plaintextOffset.to_bytes(8, 'little'))
+                        pieces.append(len(testPW).to_bytes(2, 'little'))
+                        pieces.append(testPW)
+                        plaintextOffset += INDEX_PLAINTEXT.size + len(testPW)
+                    plaintexts.write(b''.join(pieces))
+                    testedCombinations += len(tails)
+                    if len(records) >= INDEX_RUN_SIZE:
+                        runs.append(spillIndexRun(records, indexDir))
+                        records = []
+        records.sort()
+        recordSize = hashBackend.digestSize + INDEX_OFFSET.size
+        unique = writeDigestIndex(indexPath, heapq.merge(records, *[iterIndexRun(run, recordSize) for run in runs]), plaintexts)
+    except OSError as e:
+        print(f"Could not build index {indexPath}: {e}")
+        sys.exit()
+    print(f"Indexed {bcolors.YELLOW}{testedCombinations:,d}{bcolors.NORMAL} combinations ({bcolors.YELLOW}{unique:,d}{bcolors.NORMAL} unique hashes) into {indexPath}")
+    reportCandidateFilter()
+
+def spillIndexRun(records, indexDir):
+    # Sorts a run of records and parks it in a temp file until the final merge
+    records.sort()
+    run = tempfile.TemporaryFile(dir=indexDir)
+    run.write(b''.join(records))
+    run.seek(0)
+    return run
+
+def iterIndexRun(run, recordSize):
+    # Reads a spilled run back one record at a time, a few thousand records per read
+    while True:
+        chunk = run.read(recordSize * 4096)
+        if not chunk:
+            run.close()
+            return
+        for start in range(0, len(chunk), recordSize):
+            yield chunk[start:start + recordSize]
+
+def writeDigestIndex(indexPath, sortedRecords, plaintexts):
+    # Writes the finished index: header, every record with a digest I haven't seen yet (the
+    # same candidate can come out of several words or rules), then the plaintexts of just
+    # those records. The temp file of plaintexts is mmapped so each kept one is a quick
+    # slice, and they go to a second temp file until the records are all written.
+    # It's written next to the real path and swapped in at the end so a half-built index
+    # never replaces a good one. Returns how many records made it in.
+    tempPath        = indexPath + '.tmp'
+    digestSize      = hashBackend.digestSize
+    hashType        = hashBackend.name.encode('ascii')
+    count           = 0
+    lastDigest      = None
+    keptOffset      = 0
+    plaintexts.flush()
+    plaintextMap    = mmap.mmap(plaintexts.fileno(), 0, access=mmap.ACCESS_READ) if plaintexts.tell() > 0 else b''
+    with open(tempPath, 'wb') as f, tempfile.TemporaryFile(dir=path.dirname(path.abspath(indexPath))) as kept:
+        f.write(INDEX_HEADER.pack(INDEX_MAGIC, 0, hashType))
+        pieces      = []
+        keptPieces  = []
+        for record in sortedRecords:
+            digest = record[:digestSize]
+            if digest == lastDigest:
+                continue
+            lastDigest = digest
+            start       = INDEX_OFFSET.unpack_from(record, digestSize)[0]
+            stop        = start + INDEX_PLAINTEXT.size + INDEX_PLAINTEXT.unpack_from(plaintextMap, start)[0]
+            keptPieces.append(plaintextMap[start:stop])
+            pieces.append(digest + INDEX_OFFSET.pack(keptOffset))
+            keptOffset += stop - start
+            count += 1
+            if len(pieces) >= 4096:
+                f.write(b''.join(pieces))
+                kept.write(b''.join(keptPieces))
+                pieces      = []
+                keptPieces  = []
+        f.write(b''.join(pieces))
+        kept.write(b''.join(keptPieces))
+        if isinstance(plaintextMap, mmap.mmap):
+            plaintextMap.close()
+        plaintexts.close()
+        kept.seek(0)
+        shutil.copyfileobj(kept, f)
+        f.seek(0)
+        f.write(INDEX_HEADER.pack(INDEX_MAGIC, count, hashType))
+        f.flush()
+        fsync(f.fileno())
+    replace(tempPath, indexPath)
+    return count
+
+def crack_Index(crackParams):
+    # Looks every target up in an index written by --build-index. The file is mmapped and
+    # binary searched, so each hash costs about log2(records) little reads no matter how
+    # many candidates went into the index, and nothing gets hashed at all.
+    # Returns the cracked hashes if successful, otherwise returns False
+    clearTerminal()
+    try:
+        with open(crackParams.index, 'rb') as f:
+            index = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError):
+        print(f"Could not open/read index file at {crackParams.index}. Please try again.")
+        sys.exit()
+    if len(index) < INDEX_HEADER.size or INDEX_HEADER.unpack_from(index, 0)[0] != INDEX_MAGIC:
+        print(f"{crackParams.index} isn't an index built with --build-index.")
+        sys.exit()
+    magic, count, hashType = INDEX_HEADER.unpack_from(index, 0)
+    hashType = hashType.rstrip(b'\x00').decode('ascii')
+    if hashType != hashBackend.name:
+        print(f"{crackParams.index} holds {hashType} hashes, not {hashBackend.name}. Try again with --hash-type {hashType}.")
+        sys.exit()
+
+    digestSize      = hashBackend.digestSize
+    recordSize      = digestSize + INDEX_OFFSET.size
+    plaintextStart  = INDEX_HEADER.size + count * recordSize
+    for digest in list(targets):
+        position = searchDigestIndex(index, count, digest)
+        if position == None:
+            continue
+        offset = INDEX_OFFSET.unpack_from(index, INDEX_HEADER.size + position * recordSize + digestSize)[0]
+        length = INDEX_PLAINTEXT.unpack_from(index, plaintextStart + offset)[0]
+        start  = plaintextStart + offset + INDEX_PLAINTEXT.size
+        recordCrack(digest, index[start:start + length])
+    index.close()
+
+    if len(crackedHashes) > 0:
+        return crackedHashes
+    return False
+
+def searchDigestIndex(index, count, digest):
+    # Binary search over the sorted records for one digest.
+    # Returns the record number, or None if it isn't in the index
+    digestSize  = len(digest)
+    recordSize  = digestSize + INDEX_OFFSET.size
+    low         = 0
+    high        = count
+    while low < high:
+        middle  = (low + high) // 2
+        start   = INDEX_HEADER.size + middle * recordSize
+        if index[start:start + digestSize] < digest:
+            low = middle + 1
+        else:
+            high = middle
+    start = INDEX_HEADER.size + low * recordSize
+    if low < count and index[start:start + digestSize] == digest:
+        return low
+    return None
+
+# - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+# Benchmark functions
+# - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+
+BENCHMARK_VERSION       = 1
+BENCHMARK_REPEATS       = 3                 # Each benchmark keeps the best of this many runs
+BENCHMARK_SEED          = 1337              # Same synthetic words and hashes every time
+BENCHMARK_TARGETS       = 64                # Random hashes to compare against (never cracked)
+BENCHMARK_KEYSPACE_SIZE = 1 << 20           # Candidates per keyspace benchmark
+BENCHMARK_HASH_COUNT    = 1 << 18           # Candidates per hashing benchmark
+BENCHMARK_MANGLER_WORDS = 500               # Words fed through each mangler rule
+BENCHMARK_DICTIONARIES  = ((10000, ':'), (100000, ':'), (250, 'A'))  # (wordlist size, -m flags)
+
+def runBenchmarks(crackParams):
+    # Times every attack path on fixed synthetic input and saves the results as JSON so
+    # numbers can be compared between versions (or machines). Everything is timed with
+    # time.perf_counter() instead of whole seconds, and the targets are random hashes that
+    # never get cracked, so every run does exactly the same amount of work.
+    global targets, targetCount, testedCombinations, potFile
+    rng         = random.Random(BENCHMARK_SEED)
+    targets     = {rng.randbytes(16) for _ in range(BENCHMARK_TARGETS)}
+    targetCount = len(targets)
+    potFile     = None
+    words       = buildSyntheticWords(rng, max(BENCHMARK_HASH_COUNT, BENCHMARK_MANGLER_WORDS))
+    results     = []
+
+    # Keyspace enumeration (what brute force and masks walk through), with and without hashing
+    keyspace = Keyspace([MASK_CHARSETS['a']] * maxPassLength)
+    results.append(timeBenchmark('keyspace_blocks', lambda: benchmarkKeyspace(keyspace, False)))
+    results.append(timeBenchmark('keyspace_candidates', lambda: sum(len(batch) for batch in keyspace.iterBatches(0, BENCHMARK_KEYSPACE_SIZE))))
+    results.append(timeBenchmark('keyspace_hash', lambda: benchmarkKeyspace(keyspace, True)))
+    markovCharset   = list(MASK_CHARSETS['a'].decode('ascii'))
+    markovKeyspace  = MarkovKeyspace(markovCharset, trainMarkovModel(markovCharset, maxPassLength, None, None), 1, maxPassLength)
+    results.append(timeBenchmark('markov_keyspace_hash', lambda: benchmarkKeyspace(markovKeyspace, True)))
+
+    # Hashing on its own
+    hashWords = words[:BENCHMARK_HASH_COUNT]
+    results.append(timeBenchmark('hashAndCompareWord', lambda: benchmarkHashWords(hashWords)))
+    results.append(timeBenchmark('hashAndCompareBatch', lambda: benchmarkHashBatch(hashWords)))
+
+    # Each mangler rule on its own, counting the candidates it makes (not hashing them)
+    manglerWords = words[:BENCHMARK_MANGLER_WORDS]
+    for rule, generator in MANGLER_GENERATORS.items():
+        results.append(timeBenchmark(f'mangle_{rule}', lambda: countMangledCandidates(generator, manglerWords), words=len(manglerWords)))
+
+    # The whole dictionary attack, wordlist file and all
+    for size, mangler in BENCHMARK_DICTIONARIES:
+        fd, wordlistPath = tempfile.mkstemp(suffix='.txt')
+        with open(fd, 'wb') as f:
+            f.write(b'\n'.join(buildSyntheticWords(random.Random(BENCHMARK_SEED), size)) + b'\n')
+        dictParams = argparse.Namespace(**vars(crackParams))
+        dictParams.d, dictParams.m, dictParams.rules = wordlistPath, mangler, None
+        dictParams.append_mask, dictParams.prepend_mask = None, None
+        dictParams.checkpoint, dictParams.checkpoint_interval = wordlistPath + '.checkpoint', 0
+        dictParams.progress = 'silent'
+        results.append(timeBenchmark(f'crack_Dictionary_{size}_{mangler}', lambda: benchmarkDictionary(dictParams), words=size, mangler=mangler))
+        remove(wordlistPath)
+
+    report = {
+        'version'       : BENCHMARK_VERSION,
+        'python'        : sys.version.split()[0],
+        'platform'      : sys.platform,
+        'cpuCount'      : multiprocessing.cpu_count(),
+        'timestamp'     : time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'repeats'       : BENCHMARK_REPEATS,
+        'results'       : results,
+    }
+    try:
+        with open(crackParams.benchmark, 'w', encoding='utf8') as f:
+            json.dump(report, f, indent=2)
+    except OSError as e:
+        print(f"Couldn't write benchmark results to {crackParams.benchmark}: {e}")
+        sys.exit()
+    print(f"\nSaved benchmark results to {crackParams.benchmark}")
+
+def timeBenchmark(name, function, **details):
+    # Runs function() BENCHMARK_REPEATS times and keeps the fastest time. function() returns
+    # how many candidates it went through, which turns the time into a rate.
+    bestTime = None
+    for _ in range(BENCHMARK_REPEATS):
+        start       = time.perf_counter()
+        candidates  = function()
+        seconds     = time.perf_counter() - start
+        if bestTime == None or seconds < bestTime:
+            bestTime = seconds
+    rate = candidates / bestTime if bestTime > 0 else 0.0
+    print(f"{name:<32}{candidates:>14,d} candidates{floor(rate):>14,d} per second")
+    result = {'name' : name, 'candidates' : candidates, 'seconds' : bestTime, 'rate' : rate}
+    result.update(details)
+    return result
+
+def buildSyntheticWords(rng, count):
+    # Lowercase "words" of 4-10 letters, which is roughly what a real wordlist looks like to
+    # the mangler rules (every rule has something to do with them)
+    letters = string.ascii_lowercase
+    return [''.join(rng.choices(letters, k=rng.randint(4, 10))).encode('ascii') for _ in range(count)]
+
+def benchmarkKeyspace(keyspace, hashCandidates):
+    # Walks the first BENCHMARK_KEYSPACE_SIZE candidates block by block, optionally hashing
+    # them the way brute force does. Returns how many candidates that was
+    count = 0
+    for prefix, tails in keyspace.iterBlocks(0, BENCHMARK_KEYSPACE_SIZE):
+        if hashCandidates:
+            hashAndCompareSuffixes(prefix, tails)
+        count += len(tails)
+    return count
+
+def benchmarkHashWords(words):
+    # One hashAndCompareWord call per word, returns how many words that was
+    for testPW in words:
+        hashAndCompareWord(testPW)
+    return len(words)
+
+def benchmarkHashBatch(words):
+    # The same words as one hashAndCompareBatch call
+    hashAndCompareBatch(words)
+    return len(words)
+
+def countMangledCandidates(generator, words):
+    # Pulls every candidate a mangler rule generates for each word, returns how many it made
+    count = 0
+    for testPW in words:
+        for prefix, tails in generator(testPW):
+            count += len(tails)
+    return count
+
+def benchmarkDictionary(dictParams):
+    # One full crack_Dictionary run. Returns how many candidates it tested
+    global testedCombinations
+    testedCombinations = 0
+    crack_Dictionary(dictParams)
+    return testedCombinations
+
+# - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+# Pot file functions
+# - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+
+def crackFromPotFile(potPath):
+    # Answers every target that's already in the pot file without hashing a thing. Those
+    # hashes are moved straight from targets to crackedHashes before any attack starts.
+    pot = warmLoad('pot', potPath, loadPotFile)
+    found = 0
+    for digest in list(targets):
+        if digest in pot:
+            targets.discard(digest)
+            crackedHashes[digest] = pot[digest]
+            found += 1
+    if found > 0:
+        print(f"{bcolors.SUCCESS}Found {found:,d} hash(es) in {potPath} from earlier runs{bcolors.NORMAL}  ({len(targets):,d} left)")
+
+def loadPotFile(potPath):
+    # Reads the pot file into a dict of raw digest -> plaintext bytes.
+    # Each line is <hash hex>:<password>, with passwords that wouldn't survive a text line
+    # (newlines, invalid utf-8, etc.) written as $HEX[...] like hashcat does.
+    # A run that's appending right now holds an exclusive lock, so I take a shared one to
+    # never read half a line. A last line without a newline is skipped for the same reason.
+    pot = {}
+    if not path.isfile(potPath):
+        return pot
+    try:
+        with open(potPath, 'rb') as f:
+            if fcntl != None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_SH)
+            for line in f:
+                if not line.endswith(b'\n'):
+                    break
+                digest, sep, testPW = line[:-1].partition(b':')
+                if sep == b'' or not validateHash(digest.decode('ascii', errors='replace'), 0):
+                    continue
+                if testPW.startswith(b'$HEX[') and testPW.endswith(b']'):
+                    try:
+                        testPW = bytes.fromhex(testPW[5:-1].decode('ascii'))
+                    except ValueError:
+                        continue
+                pot[bytes.fromhex(digest.decode('ascii'))] = testPW
+    except OSError as e:
+        print(f"{bcolors.YELLOW}Couldn't read pot file {potPath}: {e}{bcolors.NORMAL}")
+    return pot
+
+def appendPotFile(potPath, digest, testPW):
+    # Saves a crack the moment it happens so it survives a crash or Ctrl+C. The line goes
+    # out in one write to a file opened for appending while holding an exclusive lock, so
+    # runs sharing the pot file can't mix their lines up. It's append-only, so the same
+    # hash cracked by two runs just shows up twice, which loadPotFile doesn't mind.
+    potPW = testPW
+    if b'\n' in testPW or b'\r' in testPW or testPW.startswith(b'$HEX[') or not isUTF8(testPW):
+        potPW = b'$HEX[' + testPW.hex().encode('ascii') + b']'
+    line = digest.hex().encode('ascii') + b':' + potPW + b'\n'
+    try:
+        fd = os.open(potPath, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o600)
+        try:
+            if fcntl != None:
+                fcntl.flock(fd, fcntl.LOCK_EX)
+            sizeBefore = os.fstat(fd).st_size
+            os.write(fd, line)
+
+            # If nobody else wrote to the pot since it was loaded into the warm cache, the
+            # cached copy only needs this one crack added instead of a reload next job
+            cached = warmCache.get(('pot', potPath)) if warmCache != None else None
+            if cached != None and cached[0][1] == sizeBefore:
+                stat = os.fstat(fd)
+                cached[1][digest] = testPW
+                warmCache[('pot', potPath)] = ((stat.st_mtime_ns, stat.st_size), cached[1])
+        finally:
+            os.close(fd)
+    except OSError as e:
+        print(f"{bcolors.YELLOW}Couldn't write to pot file {potPath}: {e}{bcolors.NORMAL}")
+
+def isUTF8(testPW):
+    # True if the bytes decode as utf-8, i.e. they can go into the pot file as plain text
+    try:
+        testPW.decode('utf_8')
+    except UnicodeDecodeError:
+        return False
+    return True
+
+# - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+# Checkpoint functions
+# - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+
+def saveCheckpoint(crackParams, mode, **progress):
+    # Writes everything needed to pick a run back up: the mode and its position (finished
+    # keyspace ranges for brute force, byte offset for dictionary), charset order, mangler
+    # rules and the hashes still left to crack. The file is written next to the real one and
+    # swapped in with replace(), so a crash mid-write never leaves a half-written checkpoint.
+    # crack() jobs have no checkpoint file (None) and never save one.
+    if crackParams.checkpoint == None:
+        return
+    checkpoint = buildRunState(crackParams, mode, **progress)
+    tempPath = crackParams.checkpoint + '.tmp'
+    try:
+        with open(tempPath, 'w', encoding='utf8') as f:
+            json.dump(checkpoint, f)
+            f.flush()
+            fsync(f.fileno())
+        replace(tempPath, crackParams.checkpoint)
+    except OSError as e:
+        print(f"{bcolors.YELLOW}Couldn't write checkpoint {crackParams.checkpoint}: {e}{bcolors.NORMAL}")
+
+def buildRunState(crackParams, mode, **progress):
+    # Everything that defines the run in progress as one JSON-friendly dict. It's what goes
+    # in a checkpoint, and it's also the job a coordinator hands its workers, since a worker
+    # has to rebuild the exact same keyspace or wordlist setup to make sense of its leases.
+    runState = {
+        'version'               : CHECKPOINT_VERSION,
+        'mode'                  : mode,
+        'wordlist'              : crackParams.d,
+        'mangler'               : crackParams.m,
+        'rules'                 : crackParams.rules,
+        'mangledOnly'           : crackParams.mangled_only,
+        'dedupMB'               : crackParams.dedup_mb,
+        'hashType'              : crackParams.hash_type,
+        'mask'                  : crackParams.mask,
+        'appendMask'            : crackParams.append_mask,
+        'wordLength'            : crackParams.word_length,
+        'shard'                 : crackParams.shard,
+        'prependMask'           : crackParams.prepend_mask,
+        'customCharsets'        : getCustomCharsets(crackParams),
+        'minLength'             : crackParams.min_length,
+        'maxLength'             : crackParams.max_length,
+        'maxPassLength'         : maxPassLength,
+        'charset'               : ''.join(libraryList),
+        'markovOrder'           : markovOrderToJSON(markovOrder),
+        'targets'               : [digest.hex() for digest in targets],
+        'targetCount'           : targetCount,
+        'cracked'               : {digest.hex() : testPW.hex() for digest, testPW in crackedHashes.items()},
+        'testedCombinations'    : testedCombinations,
+        'plan'                  : attackPlan,
+        }
+    runState.update(progress)
+    return runState
+
+def loadCheckpoint(crackParams):
+    # Reads a checkpoint file and restores the run state from it, overriding whatever the
+    # command line says about hashes, wordlist and mangler rules.
+    try:
+        with open(crackParams.checkpoint, 'r', encoding='utf8') as f:
+            checkpoint = json.load(f)
+    except (OSError, ValueError):
+        print(f"Could not open/read checkpoint file at {crackParams.checkpoint}. Please try again.")
+        sys.exit()
+    if checkpoint.get('version') != CHECKPOINT_VERSION:
+        print(f"{crackParams.checkpoint} was written by a different version of ettubrute and can't be resumed.")
+        sys.exit()
+    restoreRunState(crackParams, checkpoint)
+    print(f"Resuming {checkpoint['mode']} run: {len(crackedHashes):,d} cracked, {len(targets):,d} to go, {testedCombinations:,d} combinations already tested.")
+
+def restoreRunState(crackParams, checkpoint):
+    # Undoes buildRunState: puts the hashes, counters and settings back the way they were
+    global resumeState, targets, targetCount, crackedHashes, testedCombinations, maxPassLength, hashBackend
+    resumeState         = checkpoint
+    targets             = {bytes.fromhex(digest) for digest in checkpoint['targets']}
+    targetCount         = checkpoint['targetCount']
+    crackedHashes       = {bytes.fromhex(digest) : bytes.fromhex(testPW) for digest, testPW in checkpoint['cracked'].items()}
+    testedCombinations  = checkpoint['testedCombinations']
+    maxPassLength       = checkpoint['maxPassLength']
+    crackParams.d       = checkpoint['wordlist']
+    crackParams.m       = checkpoint['mangler']
+    crackParams.rules   = checkpoint['rules']
+    crackParams.mangled_only = checkpoint.get('mangledOnly', False)
+    crackParams.dedup_mb = checkpoint['dedupMB']
+    crackParams.hash_type = checkpoint['hashType']
+    hashBackend         = HASH_BACKENDS[crackParams.hash_type]
+    crackParams.mask    = checkpoint['mask']
+    crackParams.append_mask  = checkpoint['appendMask']
+    crackParams.word_length  = checkpoint['wordLength']
+    crackParams.shard        = checkpoint['shard']
+    crackParams.prepend_mask = checkpoint['prependMask']
+    crackParams.min_length = checkpoint['minLength']
+    crackParams.max_length = checkpoint['maxLength']
+    crackParams.custom_charset1, crackParams.custom_charset2, crackParams.custom_charset3, crackParams.custom_charset4 = checkpoint['customCharsets']
+    if checkpoint.get('plan') != None:
+        crackParams.plan = checkpoint['plan']['source']
+
+def removeCheckpoint(crackParams):
+    # Once a run finishes there's nothing left to resume, so the checkpoint goes away.
+    # crack() jobs have none, and mustn't delete the one a command line run left behind.
+    if crackParams.checkpoint != None and path.isfile(crackParams.checkpoint):
+        try:
+            remove(crackParams.checkpoint)
+        except OSError:
+            pass
+
+# - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+# Hash backend functions
+# - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+
+class HashBackend:
+    # A hash algorithm I know how to crack. Every attack mode hands its candidates over in
+    # batches and only gets back which ones matched, so a faster way of hashing can be added
+    # as a new backend without touching any of the enumeration code.
+    # Subclasses have to set name and digestSize and implement hash(). The batch methods
+    # below work for anything, but backends can override them with something quicker.
+    name        = None
+    digestSize  = None
+    salted      = False
+
+    def hash(self, candidate):
+        # Returns the raw digest of one candidate (bytes)
+        raise NotImplementedError
+
+    def parseTarget(self, text):
+        # Turns one hash from the user's input into the raw bytes kept in targets, or None
+        # if it isn't a hash of this type
+        if validateHash(text, self.digestSize):
+            return bytes.fromhex(text)
+        return None
+
+    def describe(self, target):
+        # How a target gets shown to the user, the same way they gave it to me
+        return target.hex()
+
+    def resetCache(self):
+        # Forgets anything worked out from an earlier target set, so one crack() job can't
+        # leak into the next
+        pass
+
+    def hashAndCompareBatch(self, candidates, wanted):
+        # Returns a list of (position in candidates, digest) for every candidate whose
+        # digest is in wanted
+        hashWord    = self.hash
+        hits        = []
+        for i, candidate in enumerate(candidates):
+            digest = hashWord(candidate)
+            if digest in wanted:
+                hits.append((i, digest))
+        return hits
+
+    def hashAndCompareSuffixes(self, prefix, suffixes, wanted):
+        # Same as hashAndCompareBatch for prefix + suffix, for every suffix in the list.
+        # Returns a list of (position in suffixes, digest) for every match
+        if prefix:
+            return self.hashAndCompareBatch([prefix + suffix for suffix in suffixes], wanted)
+        return self.hashAndCompareBatch(suffixes, wanted)
+
+class HashlibBackend(HashBackend):
+    # Any algorithm hashlib has a constructor for (md5, sha1, sha256, ...)
+
+    def __init__(self, name):
+        self.name           = name
+        self.constructor    = getattr(hashlib, name)
+        self.digestSize     = self.constructor().digest_size
+
+    def hash(self, candidate):
+        return self.constructor(candidate).digest()
+
+    def hashAndCompareBatch(self, candidates, wanted):
+        # Looks the constructor up once for the whole batch and only compares raw digest()
+        # bytes, which skips building a hex string per candidate.
+        constructor = self.constructor
+        hits        = []
+        for i, candidate in enumerate(candidates):
+            digest = constructor(candidate).digest()
+            if digest in wanted:
+                hits.append((i, digest))
+        return hits
+
+    def hashAndCompareSuffixes(self, prefix, suffixes, wanted):
+        # The prefix is fed into a hash object once and that half-finished state is copied
+        # for each suffix, so the shared part never gets hashed (or glued onto a new string)
+        # more than once.
+        if not prefix:
+            return self.hashAndCompareBatch(suffixes, wanted)
+        prefixState = self.constructor(prefix).copy
+        hits        = []
+        for i, suffix in enumerate(suffixes):
+            m = prefixState()
+            m.update(suffix)
+            digest = m.digest()
+            if digest in wanted:
+                hits.append((i, digest))
+        return hits
+
+class NTLMBackend(HashBackend):
+    # NTLM is MD4 of the password in UTF-16LE. Candidates that aren't valid UTF-8 get each
+    # byte widened to two (latin-1), which is what other crackers do with raw bytes too.
+    # Newer OpenSSL builds drop MD4 from hashlib, so I fall back to md4() below when it's
+    # missing. That's a lot slower, but it works everywhere.
+    name        = 'ntlm'
+    digestSize  = 16
+
+    def __init__(self):
+        try:
+            hashlib.new('md4', b'')
+            self.md4 = lambda data: hashlib.new('md4', data).digest()
+        except ValueError:
+            self.md4 = md4
+
+    def hash(self, candidate):
+        try:
+            wide = candidate.decode('utf_8').encode('utf_16_le')
+        except UnicodeDecodeError:
+            wide = candidate.decode('latin_1').encode('utf_16_le')
+        return self.md4(wide)
+
+def md4(data):
+    # Plain Python MD4 (RFC 1320) for when hashlib doesn't have it.
+    # Returns the raw 16-byte digest
+    mask    = 0xFFFFFFFF
+    message = data + b'\x80' + b'\x00' * ((55 - len(data)) % 64) + struct.pack('<Q', (len(data) * 8) & 0xFFFFFFFFFFFFFFFF)
+    state   = [0x67452301, 0xEFCDAB89, 0x98BADCFE, 0x10325476]
+    for blockStart in range(0, len(message), 64):
+        x = struct.unpack('<16I', message[blockStart:blockStart + 64])
+        a, b, c, d = state
+        # Each step works on a, then the registers rotate so the next step's target is in a
+        for i in range(16):
+            a = (a + ((b & c) | (~b & d)) + x[i]) & mask
+            s = MD4_SHIFTS[0][i % 4]
+            a, b, c, d = d, ((a << s) | (a >> (32 - s))) & mask, b, c
+        for i in range(16):
+            a = (a + ((b & c) | (b & d) | (c & d)) + x[MD4_ORDER[1][i]] + 0x5A827999) & mask
+            s = MD4_SHIFTS[1][i % 4]
+            a, b, c, d = d, ((a << s) | (a >> (32 - s))) & mask, b, c
+        for i in range(16):
+            a = (a + (b ^ c ^ d) + x[MD4_ORDER[2][i]] + 0x6ED9EBA1) & mask
+            s = MD4_SHIFTS[2][i % 4]
+            a, b, c, d = d, ((a << s) | (a >> (32 - s))) & mask, b, c
+        state = [(value + step) & mask for value, step in zip(state, (a, b, c, d))]
+    return struct.pack('<4I', *state)
+
+MD4_SHIFTS  = ((3, 7, 11, 19), (3, 5, 9, 13), (3, 9, 11, 15))
+MD4_ORDER   = (tuple(range(16)),
+               (0, 4, 8, 12, 1, 5, 9, 13, 2, 6, 10, 14, 3, 7, 11, 15),
+               (0, 8, 4, 12, 2, 10, 6, 14, 1, 9, 5, 13, 3, 11, 7, 15))
+
+class NumpyMD5Backend(HashlibBackend):
+    # MD5 for a whole batch at once. Short candidates (up to 55 bytes fit in one 64-byte MD5
+    # block) are packed into a NumPy array with one padded block per row, and all 64 MD5
+    # steps run down the columns with uint32 arithmetic, so Python pays for 64 steps per
+    # batch instead of one hashlib call per candidate.
+    # Checking the results is vectorized too: the first 32 bits of every digest are looked
+    # up in the targets' first 32 bits with np.isin, and only those few rows get their full
+    # digest put together and checked against the real target set.
+    # Batches too small to be worth it, and anything that doesn't fit one block, go through
+    # plain hashlib. The digests are identical, so it still calls itself md5.
+    MIN_BATCH   = 256
+    MAX_LENGTH  = 55
+
+    def __init__(self):
+        super().__init__('md5')
+        self.resetCache()
+
+    def resetCache(self):
+        self.wantedSnapshot = None
+        self.wantedWords    = None
+
+    def hashAndCompareBatch(self, candidates, wanted):
+        if np == None or len(candidates) < self.MIN_BATCH:
+            return super().hashAndCompareBatch(candidates, wanted)
+        return self.hashAndCompareGroups(b'', candidates, wanted)
+
+    def hashAndCompareSuffixes(self, prefix, suffixes, wanted):
+        if np == None or len(suffixes) < self.MIN_BATCH:
+            return super().hashAndCompareSuffixes(prefix, suffixes, wanted)
+        return self.hashAndCompareGroups(prefix, suffixes, wanted)
+
+    def hashAndCompareGroups(self, prefix, suffixes, wanted):
+        # Candidates of the same length share one array (keyspace blocks are always a single
+        # length). Returns a list of (position in suffixes, digest) for every match
+        byLength = {}
+        for i, suffix in enumerate(suffixes):
+            byLength.setdefault(len(suffix), []).append(i)
+        hits = []
+        for length, positions in byLength.items():
+            if len(prefix) + length > self.MAX_LENGTH or len(positions) < self.MIN_BATCH:
+                # Straight to hashlib, since my own hashAndCompareBatch would hand an
+                # unprefixed group right back to me
+                group = [suffixes[i] for i in positions]
+                if prefix:
+                    groupHits = HashlibBackend.hashAndCompareSuffixes(self, prefix, group, wanted)
+                else:
+                    groupHits = HashlibBackend.hashAndCompareBatch(self, group, wanted)
+                hits.extend((positions[i], digest) for i, digest in groupHits)
+                continue
+            if len(positions) == len(suffixes):
+                group = suffixes
+            else:
+                group = [suffixes[i] for i in positions]
+            for row in self.compareRows(self.md5Rows(prefix, group, length), wanted):
+                digest = hashlib.md5(prefix + group[row]).digest()
+                if digest in wanted:
+                    hits.append((positions[row], digest))
+        hits.sort()
+        return hits
+
+    def md5Rows(self, prefix, suffixes, length):
+        # Runs MD5 on prefix + suffix for a list of same-length suffixes.
+        # Returns the four uint32 state words (a, b, c, d), one array entry per suffix
+        rows        = len(suffixes)
+        total       = len(prefix) + length
+        blocks      = np.zeros((rows, 64), dtype=np.uint8)
+        blocks[:, :len(prefix)] = np.frombuffer(prefix, dtype=np.uint8)
+        if length > 0:
+            blocks[:, len(prefix):total] = np.frombuffer(b''.join(suffixes), dtype=np.uint8).reshape(rows, length)
+        blocks[:, total] = 0x80
+        blocks[:, 56:64] = np.frombuffer((total * 8).to_bytes(8, 'little'), dtype=np.uint8)
+        x = np.ascontiguousarray(blocks.view('<u4').T)
+
+        # Every step works in place on a handful of arrays, since allocating fresh arrays for
+        # each operation costs about as much as the arithmetic itself
+        a = np.full(rows, 0x67452301, dtype=np.uint32)
+        b = np.full(rows, 0xEFCDAB89, dtype=np.uint32)
+        c = np.full(rows, 0x98BADCFE, dtype=np.uint32)
+        d = np.full(rows, 0x10325476, dtype=np.uint32)
+        f = np.empty(rows, dtype=np.uint32)
+        t = np.empty(rows, dtype=np.uint32)
+        for i in range(64):
+            if i < 16:
+                np.bitwise_xor(c, d, out=f)     # (b & c) | (~b & d)
+                f &= b
+                f ^= d
+            elif i < 32:
+                np.bitwise_xor(b, c, out=f)     # (d & b) | (~d & c)
+                f &= d
+                f ^= c
+            elif i < 48:
+                np.bitwise_xor(b, c, out=f)     # b ^ c ^ d
+                f ^= d
+            else:
+                np.invert(d, out=f)             # c ^ (b | ~d)
+                f |= b
+                f ^= c
+            f += a
+            f += x[MD5_INDEXES[i]]
+            f += np.uint32(MD5_CONSTANTS[i])
+            np.left_shift(f, np.uint32(MD5_SHIFTS[i]), out=t)
+            f >>= np.uint32(32 - MD5_SHIFTS[i])
+            t |= f
+            # a, b, c, d = d, b + rotated, b, c, reusing a's array for the new b
+            a, b, c, d = d, a, b, c
+            np.add(c, t, out=b)
+        a += np.uint32(0x67452301)
+        b += np.uint32(0xEFCDAB89)
+        c += np.uint32(0x98BADCFE)
+        d += np.uint32(0x10325476)
+        return a, b, c, d
+
+    def compareRows(self, state, wanted):
+        # Finds the rows whose first digest word matches the first word of any target.
+        # The targets' words are only rebuilt when the targets differ from the snapshot I
+        # built them from. Comparing sets is much cheaper than rebuilding the array, and
+        # unlike id() a snapshot can't be fooled by a new set that landed at the same address
+        if self.wantedSnapshot != wanted:
+            self.wantedSnapshot = frozenset(wanted)
+            self.wantedWords    = np.array([int.from_bytes(digest[:4], 'little') for digest in wanted if len(digest) == 16], dtype=np.uint32)
+        return np.nonzero(np.isin(state[0], self.wantedWords))[0].tolist()
+
+MD5_SHIFTS      = [7, 12, 17, 22] * 4 + [5, 9, 14, 20] * 4 + [4, 11, 16, 23] * 4 + [6, 10, 15, 21] * 4
+MD5_CONSTANTS   = [floor(abs(math.sin(i + 1)) * 2 ** 32) & 0xFFFFFFFF for i in range(64)]
+MD5_INDEXES     = [i for i in range(16)] + [(5 * i + 1) % 16 for i in range(16)] + \
+                  [(3 * i + 5) % 16 for i in range(16)] + [(7 * i) % 16 for i in range(16)]
+
+class SaltedBackend(HashBackend):
+    # Salted hashes like md5(salt + password) or md5(password + salt), given to me as
+    # hash:salt (with $HEX[...] for salts that aren't text). A target is the raw digest with
+    # the salt tacked on the end, so targets, the pot file and checkpoints all work the way
+    # they do for plain hashes.
+    # Targets get grouped by salt, and each candidate is hashed once per distinct salt and
+    # compared against every digest with that salt, however many there are. When the salt
+    # goes first, the salt (plus a block's shared prefix) is fed to the hash once and that
+    # state is copied for every candidate, so a big leak costs about one hash per candidate
+    # per unique salt. The hashing itself is done by an unsalted backend.
+
+    salted = True
+
+    def __init__(self, base, saltFirst):
+        self.base       = base
+        self.saltFirst  = saltFirst
+        self.name       = f"{base.name}(salt+pass)" if saltFirst else f"{base.name}(pass+salt)"
+        self.digestSize = base.digestSize
+        self.resetCache()
+
+    def resetCache(self):
+        self.groupsSnapshot = None
+        self.groups         = None
+        self.base.resetCache()
+
+    def hash(self, candidate):
+        # There's no single digest for a candidate without knowing the salt
+        raise NotImplementedError
+
+    def parseTarget(self, text):
+        digestHex, sep, salt = text.partition(':')
+        if sep == '' or not validateHash(digestHex, self.digestSize):
+            return None
+        if salt.startswith('$HEX[') and salt.endswith(']'):
+            try:
+                return bytes.fromhex(digestHex) + bytes.fromhex(salt[5:-1])
+            except ValueError:
+                return None
+        return bytes.fromhex(digestHex) + salt.encode('utf_8')
+
+    def describe(self, target):
+        # Salts go back out the way parseTarget takes them, $HEX[...] for anything unprintable
+        salt = target[self.digestSize:]
+        text = formatPlaintext(salt)
+        if not text.isprintable():
+            text = '$HEX[' + salt.hex() + ']'
+        return target[:self.digestSize].hex() + ':' + text
+
+    def saltGroups(self, wanted):
+        # {salt: set of digests} for wanted. I only regroup when the targets differ from
+        # the snapshot the groups were built from, which is what happens after a crack.
+        if self.groupsSnapshot != wanted:
+            groups = {}
+            for target in wanted:
+                groups.setdefault(target[self.digestSize:], set()).add(target[:self.digestSize])
+            self.groupsSnapshot = frozenset(wanted)
+            self.groups         = groups
+        return self.groups
+
+    def hashAndCompareBatch(self, candidates, wanted):
+        return self.hashAndCompareSuffixes(b'', candidates, wanted)
+
+    def hashAndCompareSuffixes(self, prefix, suffixes, wanted):
+        hits = []
+        for salt, digests in self.saltGroups(wanted).items():
+            if self.saltFirst:
+                # The base backend hashes salt + prefix once and copies that state for
+                # every suffix
+                matches = self.base.hashAndCompareSuffixes(salt + prefix, suffixes, digests)
+            else:
+                matches = self.base.hashAndCompareSuffixes(prefix, [suffix + salt for suffix in suffixes], digests)
+            hits.extend((i, digest + salt) for i, digest in matches)
+        hits.sort()
+        return hits
+
+HASH_BACKENDS = {
+    'md5'           : HashlibBackend('md5'),
+    'md5-numpy'     : NumpyMD5Backend(),
+    'sha1'          : HashlibBackend('sha1'),
+    'sha256'        : HashlibBackend('sha256'),
+    'ntlm'          : NTLMBackend(),
+    'md5-salt-pass' : SaltedBackend(HashlibBackend('md5'), True),
+    'md5-pass-salt' : SaltedBackend(HashlibBackend('md5'), False),
+    'sha1-salt-pass': SaltedBackend(HashlibBackend('sha1'), True),
+    'sha1-pass-salt': SaltedBackend(HashlibBackend('sha1'), False),
+    'sha256-salt-pass': SaltedBackend(HashlibBackend('sha256'), True),
+    'sha256-pass-salt': SaltedBackend(HashlibBackend('sha256'), False),
+    }
+
+# - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+# Progress functions
+# - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+
+class ProgressReporter(threading.Thread):
+    # Background thread that shows how a crack is going every --progress-interval seconds.
+    # The cracking loops don't have to do anything for it: it just reads testedCombinations
+    # (plus a position function, e.g. the wordlist offset) on its own schedule, so the hot
+    # loops never stop to print or spawn a shell to clear the screen.
+    # Modes (--progress):
+    #   bar     one status line redrawn in place with \r: tested, rate, % done and ETA
+    #   json    one JSON object per line for scripts, cracks included
+    #   silent  nothing at all, cracks still get printed as they happen
+    # Used as a context manager around a cracking loop, which starts and stops the thread.
+
+    def __init__(self, crackParams, position, total):
+        # position() returns how far along I am out of total (in whatever units fit the mode)
+        super().__init__(daemon=True)
+        self.mode       = crackParams.progress
+        self.interval   = crackParams.progress_interval
+        self.position   = position
+        self.total      = total
+        self.stopEvent  = threading.Event()
+        self.lock       = threading.Lock()
+        self.lineShown  = False
+
+    def __enter__(self):
+        global progressReporter
+        self.startTime      = time.perf_counter()
+        self.startCount     = testedCombinations
+        self.startPosition  = self.position()
+        if self.mode != 'silent':
+            progressReporter = self
+            self.start()
+        return self
+
+    def __exit__(self, *exc):
+        global progressReporter
+        if self.mode != 'silent':
+            self.stopEvent.set()
+            self.join()
+            self.report()
+            with self.lock:
+                if self.lineShown:
+                    sys.stdout.write('\n')
+                    sys.stdout.flush()
+                    self.lineShown = False
+            progressReporter = None
+        return False
+
+    def run(self):
+        while not self.stopEvent.wait(self.interval):
+            self.report()
+
+    def status(self):
+        # Snapshot of the shared counters: (elapsed secs, tested, rate, fraction done, ETA secs)
+        # Fraction done and ETA are None when there's no total to measure against.
+        elapsed     = time.perf_counter() - self.startTime
+        tested      = testedCombinations
+        position    = self.position()
+        rate        = (tested - self.startCount) / elapsed if elapsed > 0 else 0.0
+        done        = None
+        eta         = None
+        if self.total:
+            done = min(position / self.total, 1.0)
+            progressed = position - self.startPosition
+            if progressed > 0:
+                eta = (self.total - position) * elapsed / progressed
+        return elapsed, tested, rate, done, eta
+
+    def report(self):
+        elapsed, tested, rate, done, eta = self.status()
+        with self.lock:
+            if self.mode == 'json':
+                print(json.dumps({'event' : 'progress', 'elapsed' : round(elapsed, 3), 'tested' : tested,
+                                  'rate' : round(rate, 1), 'done' : done, 'eta' : None if eta == None else round(eta, 1),
+                                  'left' : len(targets)}), flush=True)
+                return
+            line = f"Tested {bcolors.YELLOW}{tested:,d}{bcolors.NORMAL} at {bcolors.YELLOW}{floor(rate):,d}{bcolors.NORMAL}/sec"
+            if done != None:
+                line += f"  {done * 100:6.2f}% done"
+            if eta != None:
+                line += f"  ETA {formatDuration(eta)}"
+            if targetCount > 0:
+                line += f"  ({len(targets):,d} left)"
+            sys.stdout.write(f"\r{line}\033[K")
+            sys.stdout.flush()
+            self.lineShown = True
+
+    def cracked(self, digest, testPW):
+        # Prints a crack without mangling the status line (it gets redrawn on the next tick)
+        with self.lock:
+            if self.mode == 'json':
+                print(json.dumps({'event' : 'cracked', 'hash' : hashBackend.describe(digest), 'password' : displayPW(testPW),
+                                  'left' : len(targets)}), flush=True)
+                return
+            if self.lineShown:
+                sys.stdout.write('\r\033[K')
+                self.lineShown = False
+            print(f"{bcolors.SUCCESS}Cracked {hashBackend.describe(digest)} : {displayPW(testPW)}{bcolors.NORMAL}  ({len(targets):,d} left)", flush=True)
+
+def formatDuration(seconds):
+    # Short human readable duration for ETAs, e.g. 3d 4h 12m or 5m 09s
+    seconds = int(seconds)
+    days, seconds   = divmod(seconds, 86400)
+    hours, seconds  = divmod(seconds, 3600)
+    mins, secs      = divmod(seconds, 60)
+    if days > 0:
+        return f"{days}d {hours}h {mins:02d}m"
+    if hours > 0:
+        return f"{hours}h {mins:02d}m"
+    return f"{mins}m {secs:02d}s"
+
+# - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+# Distributed functions
+# - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+
+# A coordinator (--coordinator HOST:PORT) splits the keyspace or a compiled wordlist into
+# leases, and any number of workers (--worker HOST:PORT) connect to it, check out a lease,
+# crack it and check out the next. Every message is one line of JSON over a TCP connection,
+# worker asks and coordinator answers:
+#   {"op": "job"}                       -> the run state (same as a checkpoint) to rebuild the attack
+#   {"op": "lease"}                     -> {"lease": [start, stop]}, {"wait": secs} or {"done": true}
+#   {"op": "report", "lease": [start, stop], "tested": n, "cracked": [[digest, plaintext], ...],
+#    "since": n, "finished": bool}      -> {"cracked": [digest, ...], "lost": bool, "done": bool}
+# Workers report every LEASE_REPORT_INTERVAL seconds while working a lease. The answer lists
+# every hash cracked since the worker's last report (by anyone), so each worker stops looking
+# for them, and once nothing is left every worker hears "done". A lease nobody has reported
+# on for LEASE_TIMEOUT seconds (or whose worker disconnected) goes back in line for someone
+# else, and the worker that had it is told it "lost" it if it turns up again.
+LEASE_KEYSPACE_SIZE     = Keyspace.BATCH_SIZE * 64      # Candidates per keyspace lease
+LEASE_WORDLIST_SIZE     = WORDLIST_BATCH_SIZE * 16      # Words per dictionary lease
+LEASE_REPORT_INTERVAL   = 5                             # Seconds between a worker's reports
+LEASE_TIMEOUT           = 30                            # Seconds of silence before a lease is handed to someone else
+
+class LeaseCoordinator:
+    # Keeps track of which ranges of [0, size) are finished, leased out or still waiting,
+    # for the coordinator's request handlers. They each run in their own thread, so
+    # everything goes through one lock.
+
+    def __init__(self, job, size, leaseSize, completedRanges):
+        self.job                = job
+        self.size               = size
+        self.completedRanges    = completedRanges
+        self.waiting            = self.iterLeases(leaseSize)
+        self.returned           = []        # Leases taken back from dead workers, handed out first
+        self.leases             = {}        # (start, stop) -> [worker id, deadline]
+        self.workers            = 0
+        self.lock               = threading.Lock()
+        self.exhausted          = False
+
+    def iterLeases(self, leaseSize):
+        for missingStart, missingStop in missingRanges(self.size, self.completedRanges):
+            for start in range(missingStart, missingStop, leaseSize):
+                yield (start, min(start + leaseSize, missingStop))
+
+    def checkout(self, worker):
+        # Returns the next lease for worker, or None if every range is finished or leased out
+        with self.lock:
+            if self.returned:
+                lease = self.returned.pop()
+            else:
+                lease = next(self.waiting, None)
+                if lease == None:
+                    self.exhausted = True
+                    return None
+            self.leases[lease] = [worker, time.monotonic() + LEASE_TIMEOUT]
+            return lease
+
+    def report(self, worker, message):
+        # Records a worker's report on its lease. Returns False if the lease isn't the
+        # worker's anymore (it went quiet for too long and someone else has it).
+        # A crack only counts if its plaintext really hashes to the digest, so a buggy or
+        # hostile worker can't get wrong passwords into the results and the pot file.
+        global testedCombinations
+        lease = tuple(message['lease'])
+        with self.lock:
+            testedCombinations += message['tested']
+            for digest, testPW in message['cracked']:
+                try:
+                    digest, testPW = bytes.fromhex(digest), bytes.fromhex(testPW)
+                except (TypeError, ValueError):
+                    digest = testPW = None
+                if digest == None or not hashBackend.hashAndCompareBatch([testPW], {digest}):
+                    print(f"{bcolors.FAILED}Ignored a crack from worker {worker[0]}:{worker[1]} whose plaintext doesn't match its hash{bcolors.NORMAL}")
+                    continue
+                recordCrack(digest, testPW)
+            if self.leases.get(lease, [None])[0] != worker:
+                return False
+            if message['finished']:
+                del self.leases[lease]
+                self.completedRanges = addRange(self.completedRanges, lease[0], lease[1])
+            else:
+                self.leases[lease][1] = time.monotonic() + LEASE_TIMEOUT
+            return True
+
+    def release(self, worker=None):
+        # Takes back the leases of a worker that disconnected, or (with no worker) every
+        # lease that hasn't been reported on in time
+        now = time.monotonic()
+        with self.lock:
+            for lease, (owner, deadline) in list(self.leases.items()):
+                if owner == worker or (worker == None and deadline < now):
+                    del self.leases[lease]
+                    self.returned.append(lease)
+
+    def finished(self):
+        with self.lock:
+            return len(targets) == 0 or (self.exhausted and not self.returned and not self.leases)
+
+    def completedCount(self):
+        return sum(stop - start for start, stop in self.completedRanges)
+
+class CoordinatorHandler(socketserver.StreamRequestHandler):
+    # Talks to one connected worker, one JSON line in and one JSON line out at a time
+
+    def handle(self):
+        coordinator = self.server.coordinator
+        worker      = self.client_address
+        with coordinator.lock:
+            coordinator.workers += 1
+        try:
+            for line in self.rfile:
+                message = json.loads(line)
+                if message['op'] == 'job':
+                    reply = {'job': coordinator.job}
+                elif message['op'] == 'lease':
+                    lease = None if coordinator.finished() else coordinator.checkout(worker)
+                    if lease != None:
+                        reply = {'lease': lease}
+                    elif coordinator.finished():
+                        reply = {'done': True}
+                    else:
+                        reply = {'wait': 1}
+                else:
+                    lost = not coordinator.report(worker, message)
+                    with coordinator.lock:
+                        reply = {'cracked': [digest.hex() for digest in list(crackedHashes)[message['since']:]],
+                                 'lost': lost, 'done': len(targets) == 0}
+                self.wfile.write(json.dumps(reply).encode('utf_8') + b'\n')
+        except (OSError, ValueError, KeyError):
+            pass
+        finally:
+            coordinator.release(worker)
+            with coordinator.lock:
+                coordinator.workers -= 1
+
+def coordinateLeases(crackParams, mode, size, leaseSize, completedRanges):
+    # Serves leases of [0, size) to workers until every hash is cracked or every range is
+    # finished. Checkpoints record the finished ranges just like a local run (plus the
+    # offset a dictionary run needs), so --resume --coordinator picks up where it stopped.
+    # Returns the cracked hashes if successful, otherwise returns False
+    host, port              = crackParams.coordinator
+    coordinator             = LeaseCoordinator(buildRunState(crackParams, mode), size, leaseSize, completedRanges)
+    socketserver.ThreadingTCPServer.allow_reuse_address = True
+    try:
+        server = socketserver.ThreadingTCPServer((host, port), CoordinatorHandler)
+    except OSError as e:
+        print(f"Could not listen on {host}:{port}: {e}")
+        sys.exit()
+    server.daemon_threads   = True
+    server.coordinator      = coordinator
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    print(f"Coordinating {size:,d} {'words' if mode == 'dictionary' else 'combinations'} on {host}:{port}. Start workers with --worker {host}:{port}")
+
+    def checkpoint():
+        finished = coordinator.completedRanges
+        offset = finished[0][1] if finished and finished[0][0] == 0 else 0
+        saveCheckpoint(crackParams, mode, completed=finished, offset=offset)
+
+    nextCheckpoint = time.monotonic() + crackParams.checkpoint_interval
+    try:
+        with ProgressReporter(crackParams, coordinator.completedCount, size):
+            while not coordinator.finished():
+                time.sleep(0.2)
+                coordinator.release()
+
+                # Every so often, save the finished ranges so a crash doesn't cost days of work
+                if crackParams.checkpoint_interval > 0 and time.monotonic() >= nextCheckpoint:
+                    checkpoint()
+                    nextCheckpoint = time.monotonic() + crackParams.checkpoint_interval
+    except KeyboardInterrupt:
+        checkpoint()
+        print(f"\nStopped. Run again with --resume to pick up where I left off.")
+        sys.exit()
+    finally:
+        # Give the workers a chance to hear that it's over before the server goes away
+        deadline = time.monotonic() + LEASE_REPORT_INTERVAL + 1
+        while coordinator.workers > 0 and time.monotonic() < deadline:
+            time.sleep(0.1)
+        server.shutdown()
+        server.server_close()
+    removeCheckpoint(crackParams)
+    if len(crackedHashes) > 0:
+        return crackedHashes
+    return False
+
+class CoordinatorLink:
+    # A worker's connection to the coordinator
+
+    def __init__(self, address):
+        # The coordinator may still be starting up, so I keep trying for a bit
+        deadline = time.monotonic() + LEASE_TIMEOUT
+        while True:
+            try:
+                self.connection = socket.create_connection(address)
+                break
+            except OSError as e:
+                if time.monotonic() >= deadline:
+                    print(f"Could not connect to the coordinator at {address[0]}:{address[1]}: {e}")
+                    sys.exit()
+                time.sleep(1)
+        self.stream     = self.connection.makefile('rwb')
+        self.reported   = 0         # How many of crackedHashes the coordinator already has
+        self.heard      = 0         # How many hashes cracked by anyone I've heard about
+        self.tested     = 0         # testedCombinations at my last report
+
+    def request(self, message):
+        # Sends one message and waits for the answer. A coordinator that went away is done
+        # with me, so that's treated the same as being told so.
+        try:
+            self.stream.write(json.dumps(message).encode('utf_8') + b'\n')
+            self.stream.flush()
+            reply = self.stream.readline()
+            if reply:
+                return json.loads(reply)
+        except (OSError, ValueError):
+            pass
+        return {'done': True}
+
+    def report(self, lease, finished):
+        # Tells the coordinator what I've cracked and tested on a lease since the last report
+        # and drops whatever anyone else cracked from my targets.
+        # Returns False if I should stop working on the lease
+        cracked = list(crackedHashes.items())[self.reported:]
+        reply   = self.request({'op': 'report', 'lease': lease, 'tested': testedCombinations - self.tested,
+                                'cracked': [[digest.hex(), testPW.hex()] for digest, testPW in cracked],
+                                'since': self.heard, 'finished': finished})
+        self.reported   += len(cracked)
+        self.tested     = testedCombinations
+        self.heard      += len(reply.get('cracked', []))
+        for digest in reply.get('cracked', []):
+            targets.discard(bytes.fromhex(digest))
+        if reply.get('done'):
+            targets.clear()
+        return not reply.get('lost') and len(targets) > 0
+
+def runDistributedWorker(crackParams):
+    # Connects to a coordinator, sets up the same attack it's running and works leases until
+    # it says we're done. Cracks go to the coordinator (and its pot file), not to mine.
+    # A -d given to the worker is used in place of the coordinator's wordlist path, for when
+    # the compiled wordlist lives somewhere else on this machine.
+    global coordinatorLink, potFile, crackedHashes, testedCombinations, startTime, endTime
+    coordinatorLink = CoordinatorLink(crackParams.worker)
+    job             = coordinatorLink.request({'op': 'job'})
+    if 'job' not in job:
+        print(f"The coordinator at {crackParams.worker[0]}:{crackParams.worker[1]} has nothing to hand out.")
+        return
+    localWordlist = crackParams.d
+    restoreRunState(crackParams, job['job'])
+    if localWordlist != None:
+        crackParams.d = localWordlist
+    crackedHashes       = {}
+    testedCombinations  = 0
+    potFile             = None
+    print(f"Working on a {job['job']['mode']} crack of {len(targets):,d} hashes for {crackParams.worker[0]}:{crackParams.worker[1]}")
+
+    startTime = int(time.time())
+    if job['job']['mode'] == 'dictionary':
+        crack_Dictionary(crackParams)
+    elif job['job']['mode'] == 'mask':
+        crack_Mask(crackParams)
+    else:
+        crack_BruteForce(crackParams)
+    endTime = int(time.time())
+    print(f"The coordinator says we're done. I cracked {bcolors.YELLOW}{len(crackedHashes):,d}{bcolors.NORMAL} hashes.")
+    calculateExecutionTime(startTime, endTime, testedCombinations)
+
+def workLeases(crackParams, crackLease):
+    # Checks out leases from the coordinator and cracks them with crackLease(start, stop)
+    # until there's nothing left to do
+    while len(targets) > 0:
+        reply = coordinatorLink.request({'op': 'lease'})
+        if reply.get('done'):
+            break
+        if 'wait' in reply:
+            # Everything is leased out, but a lease may come back if its worker dies
+            time.sleep(reply['wait'])
+            continue
+        crackLease(*reply['lease'])
+    return crackedHashes
+
+def crackKeyspaceLease(keyspace, start, stop):
+    # Tests one lease of a keyspace, reporting to the coordinator as I go
+    global testedCombinations
+    nextReport = time.monotonic() + LEASE_REPORT_INTERVAL
+    for prefix, tails in keyspace.iterBlocks(start, stop):
+        for position, digest in hashAndCompareSuffixes(prefix, tails):
+            recordCrack(digest, prefix + tails[position])
+        testedCombinations += len(tails)
+        if len(targets) == 0 or time.monotonic() >= nextReport:
+            if not coordinatorLink.report([start, stop], False):
+                return
+            nextReport = time.monotonic() + LEASE_REPORT_INTERVAL
+    coordinatorLink.report([start, stop], True)
+
+def crackDictionaryLease(crackParams, start, stop):
+    # Tests one lease of a compiled wordlist (and everything the manglers make of it),
+    # reporting to the coordinator as I go
+    nextReport = time.monotonic() + LEASE_REPORT_INTERVAL
+    for words, _ in iterCompiledWordlistBatches(crackParams.d, start, lengthRange=crackParams.word_length, stop=stop):
+        crackDictionaryBatch(words)
+        if len(targets) == 0 or time.monotonic() >= nextReport:
+            if not coordinatorLink.report([start, stop], False):
+                return
+            nextReport = time.monotonic() + LEASE_REPORT_INTERVAL
+    coordinatorLink.report([start, stop], True)
+
+def parseAddress(text):
+    # argparse type for --coordinator and --worker: HOST:PORT, or just PORT for localhost
+    host, _, port = text.rpartition(':')
+    try:
+        return (host or '127.0.0.1', int(port))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"{text} isn't an address like 127.0.0.1:7777")
+
+# - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+# Attack plan functions
+# - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+
+# Mangler flags of the default plan's two mangler stages. T and y make hundreds of
+# candidates per word, so they go after everything else the wordlist can do.
+PLAN_CHEAP_MANGLERS     = 'cClnpdDrRst'
+PLAN_EXPENSIVE_MANGLERS = 'Ty'
+
+# Common password shapes the default plan tries after the wordlist, smallest keyspace first
+PLAN_MASKS = (
+    '?d?d?d?d',
+    '?d?d?d?d?d?d',
+    '?l?l?l?l?d?d',
+    '?u?l?l?l?d?d',
+    '?d?d?d?d?d?d?d?d',
+    '?u?l?l?l?l?d?d',
+    '?l?l?l?l?l?l?d?d',
+    '?u?l?l?l?l?l?d?d',
+    )
+
+# What a stage starts with unless it says otherwise, so one stage's manglers or mask never
+# carry over into the next
+PLAN_STAGE_DEFAULTS = {
+    'm'             : ':',
+    'mangled_only'  : False,
+    'rules'         : None,
+    'mask'          : None,
+    'append_mask'   : None,
+    'prepend_mask'  : None,
+    'min_length'    : None,
+    'max_length'    : None,
+    }
+
+# Every option a stage in a plan file can set. The rest come from the command line.
+PLAN_STAGE_OPTIONS = set(PLAN_STAGE_DEFAULTS) | {'d', 'word_length', 'markov', 'dedup_mb',
+    'custom_charset1', 'custom_charset2', 'custom_charset3', 'custom_charset4'}
+
+class StageBudget:
+    # How long an attack plan stage gets: seconds of wall clock and/or candidates tested,
+    # where 0 means no limit. The cracking loops call budgetSpent() every batch and wrap
+    # up early once it says so.
+
+    def __init__(self, seconds, candidates):
+        self.candidates = candidates
+        self.deadline   = time.monotonic() + seconds if seconds > 0 else None
+        self.lastTested = testedCombinations + candidates if candidates > 0 else None
+
+    def spent(self):
+        if self.deadline != None and time.monotonic() >= self.deadline:
+            return True
+        return self.lastTested != None and testedCombinations >= self.lastTested
+
+def budgetSpent():
+    # True once the attack plan stage running right now is out of budget. Outside of a
+    # plan there's no budget and it's always False.
+    return stageBudget != None and stageBudget.spent()
+
+def crack_Plan(crackParams):
+    # Runs a list of attacks one after another, cheapest first, with a time and/or candidate
+    # budget for each. By the time I get here the pot file has had its go, so the default
+    # plan is the wordlist as is, the cheap mangler rules, the expensive ones (trunc_app and
+    # years), the rules file if there is one, the common masks in PLAN_MASKS and then brute
+    # force one length at a time. Whatever a stage cracks is gone from targets before the
+    # next one starts, and a stage out of budget just hands over to the next one, so the easy
+    # majority of a big hash list gets cracked in minutes instead of waiting on one
+    # exhaustive attack.
+    # Checkpoints remember the plan and which stage it was on, so --resume carries on from
+    # the stage that was interrupted.
+    # Returns the cracked hashes if successful, otherwise returns False
+    global attackPlan, stageBudget, resumeState, interactive, libraryList
+    if resumeState != None and resumeState.get('plan') != None:
+        attackPlan = resumeState['plan']
+    else:
+        attackPlan = {
+            'source'    : crackParams.plan or '',
+            'stages'    : buildAttackPlan(crackParams),
+            'stage'     : 0,
+            'base'      : {option : getattr(crackParams, option) for option in PLAN_STAGE_OPTIONS},
+            'results'   : [{'name': 'pot file', 'cracked': len(crackedHashes), 'tested': 0, 'seconds': 0, 'outOfBudget': False}],
+            }
+    stages = attackPlan['stages']
+
+    # The stages would otherwise clear the screen of what the ones before them printed
+    wasInteractive  = interactive
+    interactive     = False
+    try:
+        while attackPlan['stage'] < len(stages) and len(targets) > 0:
+            stage       = stages[attackPlan['stage']]
+            stageParams = buildStageParams(crackParams, stage)
+            print(f"{bcolors.BLUE}Stage {attackPlan['stage'] + 1} of {len(stages)}: {stage['name']}{describeBudget(stage)}{bcolors.NORMAL}")
+            crackedBefore   = len(crackedHashes)
+            testedBefore    = testedCombinations
+            stageStart      = time.monotonic()
+            stageBudget     = StageBudget(stage['seconds'], stage['candidates'])
+            # Mangler flags and the brute force charset get added to, not replaced
+            for key in manglerRules:
+                manglerRules[key] = False
+            libraryList = []
+            ATTACK_MODES[stage['mode']](stageParams)
+            result = {
+                'name'          : stage['name'],
+                'cracked'       : len(crackedHashes) - crackedBefore,
+                'tested'        : testedCombinations - testedBefore,
+                'seconds'       : round(time.monotonic() - stageStart, 3),
+                'outOfBudget'   : len(targets) > 0 and stageBudget.spent(),
+                }
+            attackPlan['results'].append(result)
+            print(f"    {result['cracked']:,d} cracked, {result['tested']:,d} tested in {formatDuration(result['seconds'])}"
+                  f"{' (out of budget)' if result['outOfBudget'] else ''}, {len(targets):,d} left")
+
+            # Only the stage that was interrupted picks up from the checkpoint
+            stageBudget = None
+            resumeState = None
+            attackPlan['stage'] += 1
+    finally:
+        stageBudget = None
+        interactive = wasInteractive
+
+    removeCheckpoint(crackParams)
+    if len(crackedHashes) > 0:
+        return crackedHashes
+    return False
+
+def buildAttackPlan(crackParams):
+    # Returns the stages of the plan: the default one built from -d and -r, or the ones in
+    # the JSON plan file given to --plan, which is a list of stages like
+    #   [{"mode": "dictionary", "options": {"m": "cn"}, "seconds": 60},
+    #    {"mode": "mask", "options": {"mask": "?u?l?l?l?d?d"}, "candidates": 100000000}]
+    # mode is 'dictionary', 'mask' or 'brute', options uses the command line names like
+    # crack() does (anything in PLAN_STAGE_OPTIONS), and a stage without seconds or
+    # candidates gets --stage-seconds and --stage-candidates.
+    if crackParams.plan:
+        return loadAttackPlan(crackParams)
+
+    stages = []
+    if crackParams.d != None:
+        stages.append(planStage(crackParams, 'wordlist as is', 'dictionary', {}))
+        # The first stage already tested the words themselves, so the mangler stages don't
+        stages.append(planStage(crackParams, f"wordlist + cheap manglers (-m {PLAN_CHEAP_MANGLERS})", 'dictionary',
+                                {'m': PLAN_CHEAP_MANGLERS, 'mangled_only': True}))
+        stages.append(planStage(crackParams, f"wordlist + trunc_app and years (-m {PLAN_EXPENSIVE_MANGLERS})", 'dictionary',
+                                {'m': PLAN_EXPENSIVE_MANGLERS, 'mangled_only': True}))
+        if crackParams.rules != None:
+            stages.append(planStage(crackParams, f"wordlist + rules in {crackParams.rules}", 'dictionary',
+                                    {'rules': crackParams.rules, 'mangled_only': True}))
+    for mask in PLAN_MASKS:
+        stages.append(planStage(crackParams, f"mask {mask}", 'mask', {'mask': mask}))
+    for length in range(1, maxPassLength + 1):
+        stages.append(planStage(crackParams, f"brute force, length {length}", 'brute', {'min_length': length, 'max_length': length}))
+    return stages
+
+def planStage(crackParams, stageName, mode, options, seconds=None, candidates=None):
+    # One stage of a plan as a JSON-friendly dict, so it can go in a checkpoint
+    return {
+        'name'          : stageName,
+        'mode'          : mode,
+        'options'       : options,
+        'seconds'       : seconds if seconds != None else crackParams.stage_seconds,
+        'candidates'    : candidates if candidates != None else crackParams.stage_candidates,
+        }
+
+def loadAttackPlan(crackParams):
+    # Reads and checks the stages of a JSON plan file, see buildAttackPlan()
+    try:
+        with open(crackParams.plan, 'r', encoding='utf8') as f:
+            stages = json.load(f)
+    except (OSError, ValueError):
+        print(f"Could not open/read plan file at {crackParams.plan}. Please try again.")
+        sys.exit()
+    if not isinstance(stages, list) or len(stages) == 0:
+        print(f"{crackParams.plan} has to hold a list of stages.")
+        sys.exit()
+
+    plan = []
+    for number, stage in enumerate(stages, 1):
+        if not isinstance(stage, dict) or stage.get('mode') not in ('dictionary', 'mask', 'brute'):
+            print(f"Stage {number} of {crackParams.plan} needs a mode of dictionary, mask or brute.")
+            sys.exit()
+        options = {option.replace('-', '_') : value for option, value in stage.get('options', {}).items()}
+        for option in options:
+            if option not in PLAN_STAGE_OPTIONS:
+                print(f"Stage {number} of {crackParams.plan} can't set the {option} option.")
+                sys.exit()
+        if stage['mode'] == 'dictionary' and options.get('d', crackParams.d) == None:
+            print(f"Stage {number} of {crackParams.plan} is a dictionary attack, so it needs a wordlist (-d).")
+            sys.exit()
+        if stage['mode'] == 'mask' and options.get('mask') == None:
+            print(f"Stage {number} of {crackParams.plan} is a mask attack, so it needs a mask.")
+            sys.exit()
+        stageName = stage.get('name') or ' '.join([stage['mode']] + [f"{option}={value}" for option, value in options.items()])
+        plan.append(planStage(crackParams, stageName, stage['mode'], options, stage.get('seconds'), stage.get('candidates')))
+    return plan
+
+def buildStageParams(crackParams, stage):
+    # The options one stage runs with: the command line's, with the plan's starting point
+    # for everything a stage can set and then the stage's own options on top
+    stageParams = argparse.Namespace(**vars(crackParams))
+    for option, value in attackPlan['base'].items():
+        setattr(stageParams, option, value)
+    for option, value in PLAN_STAGE_DEFAULTS.items():
+        setattr(stageParams, option, value)
+    for option, value in stage['options'].items():
+        setattr(stageParams, option, value)
+    return stageParams
+
+def describeBudget(stage):
+    # ' (5m 00s or 1,000,000 candidates)' for a stage's budget, or nothing if it has none
+    limits = []
+    if stage['seconds'] > 0:
+        limits.append(formatDuration(stage['seconds']))
+    if stage['candidates'] > 0:
+        limits.append(f"{stage['candidates']:,d} candidates")
+    return f" ({' or '.join(limits)})" if limits else ''
+
+def printPlanSummary():
+    # What each stage of the attack plan cracked and what it cost, if there was a plan
+    if attackPlan == None:
+        return
+    print(f"{bcolors.BOLD}Attack plan:{bcolors.NORMAL}")
+    for result in attackPlan['results']:
+        note = '  (out of budget)' if result['outOfBudget'] else ''
+        print(f"    {result['name']:<48}{result['cracked']:>10,d} cracked {result['tested']:>16,d} tested  {formatDuration(result['seconds']):>8}{note}")
+    print()
+
+# - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+# Service functions
+# - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+
+# The attack for each mode crack() and main() can pick
+ATTACK_MODES = {
+    'dictionary'    : crack_Dictionary,
+    'mask'          : crack_Mask,
+    'brute'         : crack_BruteForce,
+    'index'         : crack_Index,
+    'plan'          : crack_Plan,
+    }
+
+# Text wordlists up to this size stay in memory between crack() jobs. They're kept as lists
+# of bytes objects, which take about five times the file size, so the limit stays small.
+# Bigger ones are read from disk every job, so compile those (--compile-wordlist) and the OS
+# keeps them cached.
+WARM_WORDLIST_LIMIT = 8 << 20
+
+class CrackError(Exception):
+    # What crack() raises when a job can't run (bad hash, missing wordlist, etc.)
+    pass
+
+def crack(hashes, mode=None, options=None):
+    # Cracks hashes (hex strings) without touching the terminal, for importing ettubrute
+    # from other Python code:
+    #   crack(['5f4dcc3b5aa765d61d8327deb882cf99'], 'dictionary', {'d': 'words.txt', 'm': 'ny'})
+    # mode is 'dictionary', 'mask', 'brute', 'index' or 'plan' and picks itself from the options
+    # (like the command line does) when left out. options uses the command line option
+    # names with dashes turned into underscores ('d', 'm', 'hash_type', 'mask', 'pot',
+    # 'workers', ...) and anything left out gets the command line default, except progress
+    # which defaults to silent. There's no checkpoint file, and a pot file is only read and
+    # written if the options name one ('pot') or ask for the default ('no_pot': False).
+    # Each job starts from a clean slate, but wordlists, rule files and the pot file stay in
+    # memory for the next job as long as the files don't change.
+    # Returns {'cracked': {hash: plaintext}, 'remaining': [hash, ...], 'tested': n, 'seconds': secs}
+    # with plaintexts that aren't valid utf-8 written as $HEX[...]. Raises CrackError if
+    # the job can't run.
+    global warmCache, interactive, potFile, targets, targetCount, hashBackend
+    if warmCache == None:
+        warmCache = {}
+    crackParams = buildArgParser().parse_args([])
+    crackParams.progress = 'silent'
+    crackParams.checkpoint = None
+    crackParams.checkpoint_interval = 0
+    options = {option.replace('-', '_') : value for option, value in (options or {}).items()}
+    for option, value in options.items():
+        if not hasattr(crackParams, option) or option in SERVICE_UNSUPPORTED_OPTIONS:
+            raise CrackError(f"crack() doesn't take the {option} option")
+        setattr(crackParams, option, value)
+    if 'pot' not in options and 'no_pot' not in options:
+        crackParams.no_pot = True
+    if crackParams.hash_type not in HASH_BACKENDS:
+        raise CrackError(f"{crackParams.hash_type} isn't a hash type I know")
+    if mode == None:
+        mode = pickAttackMode(crackParams)
+    if mode not in ATTACK_MODES:
+        raise CrackError(f"{mode} isn't an attack mode, it has to be one of {', '.join(ATTACK_MODES)}")
+    required = {'dictionary': 'd', 'mask': 'mask', 'index': 'index'}.get(mode)
+    if required != None and getattr(crackParams, required) == None:
+        raise CrackError(f"A {mode} attack needs the {required} option")
+
+    resetRunState()
+    hashBackend = HASH_BACKENDS[crackParams.hash_type]
+    if isinstance(hashes, str):
+        hashes = [hashes]
+    targets = set()
+    for pw in hashes:
+        target = hashBackend.parseTarget(pw)
+        if target == None:
+            raise CrackError(f"{pw} isn't a {hashBackend.name} hash")
+        targets.add(target)
+    targetCount = len(targets)
+
+    # Everything the attack prints (cracks, warnings, error messages) goes into output
+    # instead of wherever stdout is pointing, and the last thing it printed before giving up
+    # becomes the error message.
+    output      = io.StringIO()
+    startTime   = time.perf_counter()
+    interactive = False
+    try:
+        with contextlib.redirect_stdout(output):
+            if not crackParams.no_pot:
+                potFile = crackParams.pot
+                crackFromPotFile(potFile)
+            if len(targets) > 0:
+                ATTACK_MODES[mode](crackParams)
+    except SystemExit:
+        lines = [line for line in output.getvalue().splitlines() if line.strip()]
+        raise CrackError(lines[-1].strip() if lines else 'the attack stopped without saying why')
+    finally:
+        interactive = True
+    return {
+        'cracked'   : {hashBackend.describe(digest) : formatPlaintext(testPW) for digest, testPW in crackedHashes.items()},
+        'remaining' : [hashBackend.describe(digest) for digest in targets],
+        'tested'    : testedCombinations,
+        'seconds'   : round(time.perf_counter() - startTime, 3),
+        }
+
+# Options that set up something other than one crack job, so crack() won't take them
+SERVICE_UNSUPPORTED_OPTIONS = {'pw', 'resume', 'worker', 'coordinator', 'build_index', 'compile_wordlist', 'benchmark', 'daemon',
+    'checkpoint', 'checkpoint_interval'}
+
+def resetRunState():
+    # Puts every module global a crack touches back the way it is when the script starts,
+    # so one crack() job can't leak into the next
+    global testPW, testedCombinations, targets, targetCount, crackedHashes, resumeState, markovOrder, potFile
+    global progressReporter, manglerPipeline, candidateFilter, mangledOnly, libraryList, attackPlan, stageBudget
+    testPW              = ''
+    testedCombinations  = 0
+    targets             = set()
+    targetCount         = 0
+    crackedHashes       = {}
+    resumeState         = None
+    markovOrder         = None
+    potFile             = None
+    progressReporter    = None
+    manglerPipeline     = []
+    candidateFilter     = None
+    mangledOnly         = False
+    libraryList         = []
+    attackPlan          = None
+    stageBudget         = None
+    for key in manglerRules:
+        manglerRules[key] = False
+    for backend in HASH_BACKENDS.values():
+        backend.resetCache()
+
+def warmLoad(kind, filePath, loader):
+    # Returns loader(filePath), reusing what an earlier crack() job loaded if the file's
+    # size and modification time haven't changed since. Outside of crack() jobs there's no
+    # cache and it's just loader(filePath).
+    if warmCache == None:
+        return loader(filePath)
+    try:
+        stat = os.stat(filePath)
+    except OSError:
+        return loader(filePath)
+    version = (stat.st_mtime_ns, stat.st_size)
+    cached  = warmCache.get((kind, filePath))
+    if cached != None and cached[0] == version:
+        return cached[1]
+    value = loader(filePath)
+    warmCache[(kind, filePath)] = (version, value)
+    return value
+
+def formatPlaintext(testPW):
+    # Plaintexts go out as text, or $HEX[...] like the pot file if they aren't valid utf-8
+    if isUTF8(testPW) and not testPW.startswith(b'$HEX['):
+        return testPW.decode('utf_8')
+    return '$HEX[' + testPW.hex() + ']'
+
+def runDaemon(crackParams):
+    # Keeps ettubrute running and cracks one job per line of JSON, from stdin (--daemon) or
+    # from connections to a Unix socket (--daemon PATH):
+    #   {"id": 1, "hashes": ["5f4dcc3b5aa765d61d8327deb882cf99"], "mode": "dictionary", "options": {"m": "ny"}}
+    # and answers each with one line of JSON: what crack() returns plus the job's id, or
+    # {"id": 1, "error": "..."}. Only "hashes" is required. The options I was started with
+    # are the defaults for every job, so a daemon started with -d and -m only needs hashes.
+    # Jobs run one at a time, and stay fast because everything warmLoad() caches stays warm.
+    defaults = {option : value for option, value in vars(crackParams).items() if option not in SERVICE_UNSUPPORTED_OPTIONS}
+    defaults['progress'] = 'silent'
+    if crackParams.daemon == '-':
+        try:
+            for line in sys.stdin:
+                if line.strip():
+                    sys.stdout.write(runDaemonJob(line, defaults) + '\n')
+                    sys.stdout.flush()
+        except KeyboardInterrupt:
+            pass
+        return
+
+    if not hasattr(socketserver, 'UnixStreamServer'):
+        print(f"This OS doesn't have Unix sockets, so the daemon can only take jobs on stdin (--daemon).")
+        sys.exit()
+
+    class DaemonHandler(socketserver.StreamRequestHandler):
+        def handle(self):
+            for line in self.rfile:
+                if line.strip():
+                    self.wfile.write(runDaemonJob(line, defaults).encode('utf_8') + b'\n')
+
+    if path.exists(crackParams.daemon):
+        remove(crackParams.daemon)
+    with socketserver.UnixStreamServer(crackParams.daemon, DaemonHandler) as server:
+        print(f"Waiting for jobs on {crackParams.daemon}")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            remove(crackParams.daemon)
+
+def runDaemonJob(line, defaults):
+    # Runs one line of daemon input through crack(), returns the answer as a line of JSON
+    jobID = None
+    try:
+        job     = json.loads(line)
+        jobID   = job.get('id')
+        options = dict(defaults)
+        options.update(job.get('options', {}))
+        result  = crack(job['hashes'], job.get('mode'), options)
+    except CrackError as e:
+        result = {'error': str(e)}
+    except (ValueError, KeyError, TypeError, AttributeError) as e:
+        result = {'error': f"bad job: {e}"}
+    result['id'] = jobID
+    return json.dumps(result)
 
 # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
 # General functions
@@ -827,6 +3997,9 @@ def mangle_years(testPW):
 def clearTerminal():
     # Quick little function to clear the terminal window to keep the output clean.
     # Borrowed this function from the internet.
+    # crack() jobs leave the terminal alone, their output isn't going to one.
+    if not interactive:
+        return
     # for windows
     if name == 'nt':
         _ = system('cls')
@@ -834,18 +4007,35 @@ def clearTerminal():
     else:
         _ = system('clear')
 
-<<<<<<< HEAD
 def hashAndCompareWord(testPW):
-    # MD5 hashes the input sent and compares it to the original hashed password
-    # Returns True or False where True means the hashed dictionary word matches the
-    # hash I'm attemtpting to crack
+    # Hashes the input sent and compares it to every hash I'm still trying to crack.
+    # Returns True or False where True means the hashed dictionary word matched one of
+    # the target hashes (and it has been recorded as cracked)
+    if isinstance(testPW, str):
+        testPW = testPW.encode('utf_8')
+    if hashBackend.salted:
+        # A salted candidate has one digest per salt, so it goes the batch way
+        for _, digest in hashBackend.hashAndCompareBatch([testPW], targets):
+            return recordCrack(digest, testPW)
+        return False
+    digest = hashBackend.hash(testPW)
+    if digest in targets:
+        return recordCrack(digest, testPW)
+    return False
 
-    global pw
-    m = hashlib.md5()
-    m.update(testPW.encode('utf_8'))
-    hashedPass = m.hexdigest()
-    # Return True if original pw matches the hashed test pass, else return False
-    return (pw == hashedPass)
+def hashAndCompareBatch(candidates):
+    # Same as hashAndCompareWord, but for a whole list of byte candidates at once so the
+    # hash backend only pays for the function call and global lookups once per batch.
+    # Matches are NOT recorded here since worker processes need to ship them back to the
+    # main process.
+    # Returns a list of (position in candidates, digest) for every match
+    return hashBackend.hashAndCompareBatch(candidates, targets)
+
+def hashAndCompareSuffixes(prefix, suffixes):
+    # Hashes prefix + suffix for every suffix in the list, letting the backend share the
+    # work for the prefix between suffixes if it can.
+    # Returns a list of (position in suffixes, digest) for every match
+    return hashBackend.hashAndCompareSuffixes(prefix, suffixes, targets)
 
 def calculateExecutionTime(startTime, endTime, testedCombinations):
     # Calculates program execution time and formats it for display
@@ -872,16 +4062,20 @@ def calculateExecutionTime(startTime, endTime, testedCombinations):
     print(
         f"Total time: {bcolors.YELLOW}{days} days {hours} hours {mins} mins {secs} secs\n\n{bcolors.NORMAL}")
 
-def printResults(startTime, endTime, testedCombinations, testPW):
+def printResults(startTime, endTime, testedCombinations, crackedHashes):
     # Formats and displays final results upon a successful crack attempt
     clearTerminal()
     print(f'{bcolors.BOLD}{bcolors.SUCCESS}\nF O U N D  I T !\n- - - - - - - - ')
-    print(f"{bcolors.BOLD}{bcolors.SUCCESS}      {testPW}\n\n{bcolors.NORMAL}")
+    for digest, testPW in crackedHashes.items():
+        print(f"{bcolors.BOLD}{bcolors.SUCCESS}      {hashBackend.describe(digest)}  {displayPW(testPW)}{bcolors.NORMAL}")
+    print(f"\nCracked {bcolors.YELLOW}{len(crackedHashes):,d}{bcolors.NORMAL} of {bcolors.YELLOW}{targetCount:,d}{bcolors.NORMAL} hashes.\n\n")
+    printPlanSummary()
     beepSucces()
     calculateExecutionTime(startTime, endTime, testedCombinations)
 
 def printFailedResults(testedCombinations):
     # Formats and displays final results upon a failed crack attempt
+    printPlanSummary()
     print(f"{bcolors.FAILED}Failed.\n{bcolors.NORMAL}After {bcolors.YELLOW}{testedCombinations:,d}{bcolors.NORMAL} attempts, I was still unable to find a match. \n <Sad Panda>\n\n")
     beepFail()
     sys.exit()
@@ -895,57 +4089,101 @@ def printFailedResults(testedCombinations):
     calculateExecutionTime(startTime, endTime, testedCombinations)
 
 def userPause(message='Hit enter to continue...'):
-=======
-def printResults(startTime, testedCombos, testPW):
-    clear()
-    winsound.Beep(666, 666)
-
-    print(f'{bcolors.BOLD}{bcolors.PASS_RESULT}\nF O U N D  I T !\n- - - - - - - - ')
-    print(f"{bcolors.BOLD}{bcolors.PASS_RESULT}      {testPW}\n\n{bcolors.NORMAL}")
-    finalLibraryString = ''
-    for i in library:
-        finalLibraryString  = finalLibraryString + i
-    print(f"The test library sequence used for this round was: \n   {bcolors.YELLOW}{finalLibraryString}\n\n{bcolors.NORMAL}")
-    endTime = int(time.time())
-    calculateExecutionTime(startTime, endTime, testedCombos)
-def userPause(message='Hit any key to continue...'):
->>>>>>> 8573649931b72d2493a8590358ab30f36f2a5c35
     # Simple functions acts as a breakpoint on screen.
     input(message)
 
 def beepSucces():
     # Plays an ascending alert tone sequence upon successfully cracking a password
+    if winsound == None:
+        print('\a', end='')
+        return
     for i in range(1, 5):
         winsound.Beep(666 * i, 50)
 
 def beepFail():
     # Plays a descending alert tone sequence upon unsuccessfull crack attempt
+    if winsound == None:
+        print('\a', end='')
+        return
     winsound.Beep(750, 40)
     winsound.Beep(500, 40)
     winsound.Beep(300, 40)
     winsound.Beep(100, 40)
 
+def buildArgParser():
+    # The command line options, also where crack() gets its defaults from
+    parser      = argparse.ArgumentParser(prog='ettubrute', description='''
+        Crack an MD5-hashed password (or SHA-1, SHA-256 and NTLM with -t).
+        Defaults to a brute force method unless you supply a wordlist,
+        then it will default to a dictionary attack.
+        There are a few mangler rules set up by adding the -m=\'\' flag.\n
+        Ex.: -m=\'c\' iterates through the dictionary and capitalizes the first letter.''')
+    parser.add_argument('pw',                   type=str, help='hash string -OR- /path/to/hash_file', nargs='?', default=None)
+    parser.add_argument('-t', '--hash-type',    type=str, help='[Optional] kind of hash to crack (default md5)',  default='md5', choices=list(HASH_BACKENDS))
+    parser.add_argument('-d', '-dictionary',    type=str, help='[Optional] /path/to/wordlist_file for dictionary-based crack',  default=None)
+    parser.add_argument('-m', '-mangler',       type=str, help='[Optional] enables wordlist mangling rules.',  default=':')
+    parser.add_argument('--mangled-only',       help='[Optional] only test what -m, -r and hybrid masks make of each wordlist entry, not the entry itself',  action='store_true')
+    parser.add_argument('--dedup-mb',           type=int, help='[Optional] MB of memory for skipping mangled candidates already tried for an earlier word (0 = off)',  default=0)
+    parser.add_argument('--compile-wordlist',   type=str, help='[Optional] /path/to/output_file to compile the -d wordlist into (deduplicated, binary)',  default=None)
+    parser.add_argument('--word-length',        type=parseWordLength, help='[Optional] only use wordlist entries of this length or MIN-MAX range',  default=None)
+    parser.add_argument('--shard',              type=parseShard, help='[Optional] only use the I-th of N slices of a compiled wordlist, e.g. 2/8',  default=None)
+    parser.add_argument('--coordinator',        type=parseAddress, help='[Optional] HOST:PORT to hand out the crack to --worker processes from',  default=None)
+    parser.add_argument('--worker',             type=parseAddress, help='[Optional] HOST:PORT of a --coordinator to crack for',  default=None)
+    parser.add_argument('-r', '--rules',        type=str, help='[Optional] /path/to/rules_file of hashcat-style mangling rules',  default=None)
+    parser.add_argument('--mask',               type=str, help='[Optional] mask attack, e.g. ?u?l?l?l?l?d?d (?l ?u ?d ?s ?a ?h ?H ?b ?1-?4)',  default=None)
+    parser.add_argument('--append-mask',        type=str, help='[Optional] hybrid attack, append every candidate of this mask to each wordlist entry',  default=None)
+    parser.add_argument('--prepend-mask',       type=str, help='[Optional] hybrid attack, prepend every candidate of this mask to each wordlist entry',  default=None)
+    parser.add_argument('-1', '--custom-charset1', type=str, help='[Optional] charset for ?1 in a mask, e.g. ?l?d',  default=None)
+    parser.add_argument('-2', '--custom-charset2', type=str, help='[Optional] charset for ?2 in a mask',  default=None)
+    parser.add_argument('-3', '--custom-charset3', type=str, help='[Optional] charset for ?3 in a mask',  default=None)
+    parser.add_argument('-4', '--custom-charset4', type=str, help='[Optional] charset for ?4 in a mask',  default=None)
+    parser.add_argument('--min-length',         type=int, help='[Optional] shortest candidate to try with a mask or brute force (default: mask length, or 1)',  default=None)
+    parser.add_argument('--max-length',         type=int, help='[Optional] longest candidate to try with a mask or brute force (default: mask length, or maxPassLength)',  default=None)
+    parser.add_argument('--markov',             type=str, help='[Optional] /path/to/wordlist to learn brute force character order from (repeatable)',  default=None, action='append')
+    parser.add_argument('-w', '--workers',      type=int, help='[Optional] number of processes for cracking (0 = one per CPU core)',  default=1)
+    parser.add_argument('--checkpoint',         type=str, help='[Optional] /path/to/checkpoint_file to save progress to',  default='ettubrute.checkpoint')
+    parser.add_argument('--checkpoint-interval', type=int, help='[Optional] seconds between checkpoints (0 = never)',  default=60)
+    parser.add_argument('--resume',             action='store_true', help='[Optional] continue the run saved in the checkpoint file')
+    parser.add_argument('--pot',                type=str, help='[Optional] /path/to/pot_file of every hash cracked so far',  default='ettubrute.pot')
+    parser.add_argument('--no-pot',             action='store_true', help="[Optional] don't read or write the pot file")
+    parser.add_argument('--build-index',        type=str, help='[Optional] /path/to/index_file to hash every -d/-m/-r candidate into',  default=None)
+    parser.add_argument('--index',              type=str, help='[Optional] /path/to/index_file to look the hashes up in',  default=None)
+    parser.add_argument('--progress',           type=str, help='[Optional] how to show progress: bar, json (one object per line) or silent',  default='bar', choices=['bar', 'json', 'silent'])
+    parser.add_argument('--progress-interval',  type=float, help='[Optional] seconds between progress updates (default 1)',  default=1.0)
+    parser.add_argument('--benchmark',          type=str, help='[Optional] /path/to/results_file to time every attack path into (JSON)',  default=None)
+    parser.add_argument('--plan',               type=str, help='[Optional] run the cheap attacks first and the expensive ones last, or the stages in this JSON plan file',  default=None, nargs='?', const='')
+    parser.add_argument('--stage-seconds',      type=float, help='[Optional] seconds each attack plan stage gets before moving on (0 = no limit)',  default=300)
+    parser.add_argument('--stage-candidates',   type=int, help='[Optional] candidates each attack plan stage gets before moving on (0 = no limit)',  default=0)
+    parser.add_argument('--daemon',             type=str, help='[Optional] take jobs as JSON lines on stdin, or on a Unix socket at this path',  default=None, nargs='?', const='-')
+    return parser
+
 if __name__ == "__main__":
     # Initializes some variables, parses user commnad line input, and executes
     # main() function
 
     # initialize some variables
-    charCounts          = []
     libraryList         = []
-    md5library          = buildMD5Library()
-    md5String           = buildMD5tring()
 
     # Read user commnd line vars
-    parser      = argparse.ArgumentParser(prog='ettubrute', description='''
-        Crack an MD5-hashed password.
-        Defaults to a brute force method unless you supply a wordlist,
-        then it will default to a dictionary attack.
-        There are a few mangler rules set up by adding the -m=\'\' flag.\n
-        Ex.: -m=\'c\' iterates through the dictionary and capitalizes the first letter.''')
-    parser.add_argument('pw',                   type=str, help='md5 hash string -OR- /path/to/md5hash_file')
-    parser.add_argument('-d', '-dictionary',    type=str, help='[Optional] /path/to/wordlist_file for dictionary-based crack',  default=None)
-    parser.add_argument('-m', '-mangler',       type=str, help='[Optional] enables wordlist mangling rules.',  default=':')
+    parser      = buildArgParser()
     crackParams = parser.parse_args()
+    if crackParams.build_index != None and crackParams.d == None:
+        parser.error('--build-index needs a wordlist (-d)')
+    if crackParams.compile_wordlist != None and crackParams.d == None:
+        parser.error('--compile-wordlist needs a wordlist (-d)')
+    if crackParams.coordinator != None and crackParams.worker != None:
+        parser.error('--coordinator and --worker can\'t be used together')
+    if crackParams.plan != None and (crackParams.m != ':' or crackParams.mask != None or crackParams.append_mask != None or crackParams.prepend_mask != None):
+        parser.error('--plan picks the manglers and masks of each stage itself, put them in a plan file to choose your own')
+    if crackParams.plan != None and (crackParams.index != None or crackParams.coordinator != None or crackParams.worker != None):
+        parser.error('--plan can\'t be used with --index, --coordinator or --worker')
+    if crackParams.pw == None and crackParams.resume == False and crackParams.build_index == None and crackParams.benchmark == None \
+            and crackParams.compile_wordlist == None and crackParams.worker == None and crackParams.daemon == None:
+        parser.error('the following arguments are required: pw')
+
+    # A daemon's stdout is for answers only
+    if crackParams.daemon != None:
+        interactive = False
 
     # Clean up the terminal windows
     clearTerminal()
@@ -954,12 +4192,7 @@ if __name__ == "__main__":
     main(crackParams)
 
     # Keep the window from closing instantly
-<<<<<<< HEAD
-    userPause('Thanks for playing!\n\nHit enter to exit...')
+    if crackParams.daemon == None:
+        userPause('Thanks for playing!\n\nHit enter to exit...')
 
     # Fini.
-=======
-    userPause()
-    
-    # Fini.
->>>>>>> 8573649931b72d2493a8590358ab30f36f2a5c35